@@ -1,10 +1,16 @@
 import os
+import json
 import time
+import asyncio
 import logging
 import gzip
+import hashlib
+import hmac
+import mimetypes
 import openai
 from io import BytesIO
-from quart import Quart, request, jsonify, Blueprint, current_app
+from quart import Quart, request, jsonify, Blueprint, current_app, abort, send_file, g, make_response
+from werkzeug.utils import safe_join
 from azure.identity.aio import DefaultAzureCredential
 from azure.search.documents.aio import SearchClient
 from azure.search.documents.indexes.aio import SearchIndexClient
@@ -12,6 +18,12 @@ from azure.search.documents.indexes.aio import SearchIndexClient
 from searchText import SearchText
 from searchImages import SearchImages
 from indexSchema import IndexSchema
+from embeddingBundle import EmbeddingBundle
+from embeddingStore import EmbeddingStore
+from vectorVariant import VectorVariant
+from jsonProvider import OrjsonProvider
+from titleSuggester import TitleSuggester
+from profiler import SamplingProfiler, SlowRequestProfiler
 
 CONFIG_OPENAI_TOKEN = "openai_token"
 CONFIG_CREDENTIAL = "azure_credential"
@@ -21,19 +33,89 @@ CONFIG_SEARCH_WIKIPEDIA_INDEX = "search_wikipedia"
 CONFIG_SEARCH_IMAGES_INDEX = "search_images"
 CONFIG_INDEX = "index"
 CONFIG_INDEX_WIKIPEDIA = "index_wikipedia"
+CONFIG_INDEX_VARIANTS = "index_variants"
+CONFIG_EMBEDDING_BUNDLE = "embedding_bundle"
+CONFIG_EMBEDDING_STORE = "embedding_store"
+CONFIG_VECTOR_VARIANTS = "vector_variants"
+CONFIG_TITLE_SUGGESTERS = "title_suggesters"
+CONFIG_SAMPLE_QUERIES = "sample_queries"
+CONFIG_ADMIN_KEY = "admin_key"
+CONFIG_SAMPLING_PROFILER = "sampling_profiler"
+CONFIG_SLOW_REQUEST_PROFILER = "slow_request_profiler"
+
+EMBEDDING_BUNDLE_DIR = os.path.join(os.path.dirname(__file__), "embeddings")
+# Sample cards shown by the frontend, also pre-embedded by prepdata.py
+SAMPLE_QUERIES_PATH = os.path.join(os.path.dirname(__file__), "sample-queries.json")
 
 dataSetConfigDict = {
      "sample": CONFIG_SEARCH_TEXT_INDEX,
      "wikipedia": CONFIG_SEARCH_WIKIPEDIA_INDEX
 }
 
+# SearchText.search options for each approach the frontend compares
+approachOptionsDict = {
+    "text": {},
+    "vec": {"use_vector_search": True},
+    "hs": {"use_vector_search": True, "use_hybrid_search": True},
+    "hssr": {"use_vector_search": True, "use_hybrid_search": True, "use_semantic_ranker": True},
+}
+
+# Vite emits content-hashed file names under assets/, so they never change
+STATIC_IMMUTABLE_DIR = "assets/"
+STATIC_ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
 bp = Blueprint("routes", __name__, static_folder="static")
+static_etags = {}
+
+
+def static_file_etag(file_path: str):
+    stat = os.stat(file_path)
+    key = (file_path, stat.st_mtime_ns, stat.st_size)
+    if key not in static_etags:
+        with open(file_path, "rb") as file:
+            static_etags[key] = hashlib.sha256(file.read()).hexdigest()[:32]
+    return static_etags[key]
 
 
 @bp.route("/", defaults={"path": "index.html"})
 @bp.route("/<path:path>")
 async def static_file(path):
-    return await bp.send_static_file(path)
+    file_path = safe_join(bp.static_folder, path)
+    if file_path is None or not os.path.isfile(file_path):
+        abort(404)
+
+    # Serve the .br/.gz siblings generated by the frontend build when accepted
+    mimetype = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+    encodings = [
+        (encoding, file_path + extension)
+        for encoding, extension in STATIC_ENCODINGS
+        if os.path.isfile(file_path + extension)
+    ]
+    # Highest client q-value wins, ties go to the smaller br; q=0 means refused
+    accepted = [
+        (e, p) for e, p in encodings if request.accept_encodings[e] > 0
+    ]
+    content_encoding, served_path = max(
+        accepted,
+        key=lambda a: request.accept_encodings[a[0]],
+        default=(None, file_path),
+    )
+
+    response = await send_file(served_path, mimetype=mimetype, add_etags=False)
+    response.set_etag(static_file_etag(served_path))
+    # send_file always sets Expires, which would contradict Cache-Control below
+    response.headers.pop("Expires", None)
+    if content_encoding:
+        response.headers["Content-Encoding"] = content_encoding
+    if encodings:
+        response.headers["Vary"] = "Accept-Encoding"
+    if path.startswith(STATIC_IMMUTABLE_DIR):
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    else:
+        response.headers["Cache-Control"] = "no-cache"
+
+    await response.make_conditional(request)
+    return response
 
 
 @bp.route("/embedQuery", methods=["POST"])
@@ -41,10 +123,25 @@ async def embed_query():
     try:
         request_json = await request.get_json()
         query = request_json["query"]
-        response = await openai.Embedding.acreate(
-            input=query, engine=current_app.config[CONFIG_EMBEDDING_DEPLOYMENT]
-        )
-        return response["data"][0]["embedding"], 200
+
+        # Sample and hot queries are pre-embedded by prepdata.py
+        embedding_bundle = current_app.config[CONFIG_EMBEDDING_BUNDLE]
+        if embedding_bundle:
+            embedding = embedding_bundle.get(query)
+            if embedding is not None:
+                return jsonify(embedding), 200
+
+        # Embeddings paid for by any worker or by prepdata.py are persisted
+        deployment = current_app.config[CONFIG_EMBEDDING_DEPLOYMENT]
+        embedding_store = current_app.config[CONFIG_EMBEDDING_STORE]
+        embedding = await asyncio.to_thread(embedding_store.get, deployment, query)
+        if embedding is not None:
+            return jsonify(embedding), 200
+
+        response = await openai.Embedding.acreate(input=query, engine=deployment)
+        embedding = response["data"][0]["embedding"]
+        await asyncio.to_thread(embedding_store.put, deployment, query, embedding)
+        return embedding, 200
     except Exception as e:
         logging.exception("Exception in /embedQuery")
         return jsonify({"error": str(e)}), 500
@@ -101,6 +198,131 @@ async def search_text():
         return jsonify({"error": str(e)}), 500
 
 
+@bp.route("/searchTextStream", methods=["POST"])
+async def search_text_stream():
+    if not request.is_json:
+        return jsonify({"error": "request must be json"}), 400
+    try:
+        request_json = await request.get_json()
+        approaches = (
+            request_json["approaches"]
+            if request_json.get("approaches")
+            else list(approachOptionsDict)
+        )
+        unknown_approaches = [a for a in approaches if a not in approachOptionsDict]
+        if unknown_approaches:
+            return jsonify({"error": f"unknown approaches {unknown_approaches}"}), 400
+
+        use_semantic_captions = (
+            request_json["useSemanticCaptions"]
+            if request_json.get("useSemanticCaptions")
+            else False
+        )
+        data_set = request_json["dataSet"] if request_json.get("dataSet") else "sample"
+        search_index = current_app.config[dataSetConfigDict[data_set]]
+        search_args = {
+            "query": request_json["query"],
+            "select": request_json["select"] if request_json.get("select") else None,
+            "k": request_json["k"] if request_json.get("k") else 10,
+            "filter": request_json["filter"] if request_json.get("filter") else None,
+            "query_vector": (
+                request_json["queryVector"] if request_json.get("queryVector") else None
+            ),
+            "data_set": data_set,
+        }
+    except Exception as e:
+        logging.exception("Exception in /searchTextStream")
+        return jsonify({"error": str(e)}), 500
+
+    json_provider = current_app.json
+
+    async def search_approach(approach: str):
+        started_time = time.perf_counter()
+        options = approachOptionsDict[approach]
+        r = await search_index.search(
+            **search_args,
+            **options,
+            use_semantic_captions=use_semantic_captions
+            and options.get("use_semantic_ranker", False),
+        )
+        r["approach"] = approach
+        r["elapsedMs"] = (time.perf_counter() - started_time) * 1000
+        return r
+
+    def event(name: str, data: dict) -> bytes:
+        return f"event: {name}\ndata: {json_provider.dumps(data)}\n\n".encode()
+
+    # Each approach is sent as soon as it finishes instead of waiting for the slowest
+    async def events():
+        tasks = {asyncio.create_task(search_approach(a)): a for a in approaches}
+        try:
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception():
+                        logging.error(
+                            "Exception in /searchTextStream", exc_info=task.exception()
+                        )
+                        yield event(
+                            "error",
+                            {"approach": tasks[task], "error": str(task.exception())},
+                        )
+                    else:
+                        yield event("result", task.result())
+            yield event("done", {})
+        finally:
+            # The client went away, so stop paying for searches nobody will see
+            for task in tasks:
+                task.cancel()
+
+    response = await make_response(
+        events(),
+        200,
+        {
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        },
+    )
+    response.timeout = None
+    return response
+
+
+@bp.route("/getDataSets", methods=["GET"])
+async def get_datasets():
+    return jsonify(
+        [
+            {"key": "sample", "dataSet": "sample", "dimensions": 1536},
+            {"key": "wikipedia", "dataSet": "wikipedia", "dimensions": 1536},
+        ]
+        + [
+            {**variant.details, "key": variant.name}
+            for variant in current_app.config[CONFIG_VECTOR_VARIANTS]
+        ]
+    ), 200
+
+
+@bp.route("/getSampleQueries", methods=["GET"])
+async def get_sample_queries():
+    return jsonify(current_app.config[CONFIG_SAMPLE_QUERIES]), 200
+
+
+@bp.route("/suggest", methods=["GET"])
+async def suggest():
+    try:
+        query = request.args.get("q", "")
+        data_set = request.args.get("dataSet", "sample")
+        top = request.args.get("top", 8, type=int)
+        suggester = current_app.config[CONFIG_TITLE_SUGGESTERS].get(data_set)
+        return jsonify(suggester.suggest(query, top) if suggester else []), 200
+    except Exception as e:
+        logging.exception("Exception in /suggest")
+        return jsonify({"error": str(e)}), 500
+
+
 @bp.route("/searchImages", methods=["POST"])
 async def search_images():
     if not request.is_json:
@@ -131,13 +353,114 @@ async def update_efsearch():
     try:
         request_json = await request.get_json()
         newValue = request_json["efSearch"] if request_json.get("efSearch") else None
-        await current_app.config[CONFIG_INDEX_WIKIPEDIA].update_efsearch(int(newValue))
+        # Variants get the same setting so they compare fairly with their source index
+        await asyncio.gather(
+            current_app.config[CONFIG_INDEX_WIKIPEDIA].update_efsearch(int(newValue)),
+            *(
+                index.update_efsearch(int(newValue))
+                for index in current_app.config[CONFIG_INDEX_VARIANTS]
+            ),
+        )
         ef_search = await current_app.config[CONFIG_INDEX].update_efsearch(int(newValue))
         return str(ef_search), 200
     except Exception as e:
         logging.exception("Exception in /updateEfSearch")
         return jsonify({"error": str(e)}), 500
 
+def is_admin_request():
+    admin_key = current_app.config[CONFIG_ADMIN_KEY]
+    return bool(admin_key) and hmac.compare_digest(
+        request.headers.get("X-Admin-Key", ""), admin_key
+    )
+
+
+@bp.route("/admin/profile", methods=["POST"])
+async def admin_profile():
+    if not is_admin_request():
+        return jsonify({"error": "forbidden"}), 403
+    if current_app.config[CONFIG_SAMPLING_PROFILER]:
+        return jsonify({"error": "a profile is already running in this worker"}), 409
+    try:
+        seconds = min(request.args.get("seconds", 10, type=float), 60)
+        interval_ms = max(request.args.get("intervalMs", 5, type=float), 1)
+        output_format = request.args.get("format", "speedscope")
+
+        # Sample this worker's event loop thread while the request sleeps on it
+        profiler = SamplingProfiler(asyncio.get_running_loop(), interval_ms / 1000)
+        current_app.config[CONFIG_SAMPLING_PROFILER] = profiler
+        profiler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.stop()
+            current_app.config[CONFIG_SAMPLING_PROFILER] = None
+
+        if output_format == "collapsed":
+            return profiler.collapsed(), 200, {"Content-Type": "text/plain"}
+        return jsonify(profiler.speedscope()), 200
+    except Exception as e:
+        logging.exception("Exception in /admin/profile")
+        return jsonify({"error": str(e)}), 500
+
+
+@bp.route("/admin/slowRequests", methods=["GET", "POST"])
+async def admin_slow_requests():
+    if not is_admin_request():
+        return jsonify({"error": "forbidden"}), 403
+    try:
+        if request.method == "POST":
+            request_json = await request.get_json()
+            threshold_ms = request_json.get("thresholdMs")
+            current_app.config[CONFIG_SLOW_REQUEST_PROFILER] = (
+                SlowRequestProfiler(float(threshold_ms)) if threshold_ms else None
+            )
+        slow_request_profiler = current_app.config[CONFIG_SLOW_REQUEST_PROFILER]
+        return jsonify(
+            {
+                "pid": os.getpid(),
+                "thresholdMs": slow_request_profiler.threshold_ms if slow_request_profiler else None,
+                "captures": list(slow_request_profiler.captures) if slow_request_profiler else [],
+            }
+        ), 200
+    except Exception as e:
+        logging.exception("Exception in /admin/slowRequests")
+        return jsonify({"error": str(e)}), 500
+
+
+@bp.route("/admin/cacheStats", methods=["GET"])
+async def admin_cache_stats():
+    if not is_admin_request():
+        return jsonify({"error": "forbidden"}), 403
+    return jsonify(
+        {
+            "pid": os.getpid(),
+            "imageEmbeddings": current_app.config[CONFIG_SEARCH_IMAGES_INDEX].cache_stats(),
+        }
+    ), 200
+
+
+@bp.before_request
+async def begin_request_profile():
+    slow_request_profiler = current_app.config.get(CONFIG_SLOW_REQUEST_PROFILER)
+    if slow_request_profiler and request.endpoint != "routes.admin_slow_requests":
+        profile = slow_request_profiler.begin()
+        if profile:
+            g.request_profiler = slow_request_profiler
+            g.request_profile = profile
+            g.request_started_time = time.perf_counter()
+
+
+# Teardown runs after every after_request hook, including gzip_response, and
+# also when the handler fails or the client disconnects. The profiler that
+# started the profile ends it even if it was switched off in the meantime.
+@bp.teardown_request
+async def end_request_profile(exception):
+    profile = g.pop("request_profile", None)
+    if profile:
+        elapsed_ms = (time.perf_counter() - g.request_started_time) * 1000
+        g.pop("request_profiler").end(profile, request.path, elapsed_ms)
+
+
 @bp.before_request
 async def ensure_openai_token():
     openai_token = current_app.config[CONFIG_OPENAI_TOKEN]
@@ -151,9 +474,12 @@ async def ensure_openai_token():
 
 @bp.after_request
 async def gzip_response(response):
+    # Static files are either precompressed at build time or not worth compressing,
+    # and buffering a streamed response would hold back every event until the last
     accept_encoding = request.headers.get("Accept-Encoding", "")
     if (
-        response.status_code < 200
+        request.endpoint in ("routes.static_file", "routes.search_text_stream")
+        or response.status_code < 200
         or response.status_code >= 300
         or len(await response.get_data()) < 500
         or "gzip" not in accept_encoding.lower()
@@ -187,6 +513,11 @@ async def setup_clients():
     AZURE_SEARCH_TEXT_INDEX_NAME = os.getenv("AZURE_SEARCH_TEXT_INDEX_NAME")
     AZURE_SEARCH_IMAGE_INDEX_NAME = os.getenv("AZURE_SEARCH_IMAGE_INDEX_NAME")
     AZURE_SEARCH_WIKIPEDIA_INDEX_NAME = os.getenv("AZURE_SEARCH_WIKIPEDIA_INDEX_NAME")
+    # Admin endpoints such as /admin/profile are disabled unless a key is set
+    ADMIN_KEY = os.getenv("ADMIN_KEY")
+    EMBEDDING_STORE_PATH = os.getenv("EMBEDDING_STORE_PATH") or os.path.join(
+        EMBEDDING_BUNDLE_DIR, "embeddings.sqlite"
+    )
 
     # Use the current user identity to authenticate with Azure OpenAI, Cognitive Search and AI Vision (no secrets needed, just use 'az login' locally, and managed identity when deployed on Azure).
     # If you need to use keys, use separate AzureKeyCredential instances with the keys for each service.
@@ -226,21 +557,61 @@ async def setup_clients():
     )
 
     # Store on app.config for later use inside requests
+    current_app.config[CONFIG_ADMIN_KEY] = ADMIN_KEY
+    current_app.config[CONFIG_SAMPLING_PROFILER] = None
+    current_app.config[CONFIG_SLOW_REQUEST_PROFILER] = None
     current_app.config[CONFIG_OPENAI_TOKEN] = openai_token
     current_app.config[CONFIG_CREDENTIAL] = azure_credential
     current_app.config[CONFIG_EMBEDDING_DEPLOYMENT] = AZURE_OPENAI_DEPLOYMENT_NAME
+    current_app.config[CONFIG_EMBEDDING_BUNDLE] = EmbeddingBundle.load(
+        EMBEDDING_BUNDLE_DIR, AZURE_OPENAI_DEPLOYMENT_NAME
+    )
+    current_app.config[CONFIG_EMBEDDING_STORE] = EmbeddingStore(EMBEDDING_STORE_PATH)
     current_app.config[CONFIG_SEARCH_TEXT_INDEX] = SearchText(search_client_text)
     current_app.config[CONFIG_SEARCH_IMAGES_INDEX] = SearchImages(
         search_client_images,
         AZURE_VISIONAI_ENDPOINT,
         AZURE_VISIONAI_API_VERSION,
         AZURE_VISIONAI_KEY,
+        index_schema=IndexSchema(index_client, AZURE_SEARCH_IMAGE_INDEX_NAME),
     )
     current_app.config[CONFIG_SEARCH_WIKIPEDIA_INDEX] = SearchText(search_client_wikipedia)
     current_app.config[CONFIG_INDEX] = IndexSchema(index_client, AZURE_SEARCH_TEXT_INDEX_NAME)
     current_app.config[CONFIG_INDEX_WIKIPEDIA] = IndexSchema(index_client, AZURE_SEARCH_WIKIPEDIA_INDEX_NAME)
 
+    # Reduced-dimension index variants built by prepdata.py become extra datasets
+    vector_variants = VectorVariant.load_all(EMBEDDING_BUNDLE_DIR)
+    for variant in vector_variants:
+        search_client_variant = SearchClient(
+            endpoint=AZURE_SEARCH_SERVICE_ENDPOINT,
+            index_name=variant.index_name,
+            credential=azure_credential,
+        )
+        config_key = f"search_{variant.name}"
+        current_app.config[config_key] = SearchText(search_client_variant, variant)
+        dataSetConfigDict[variant.name] = config_key
+    current_app.config[CONFIG_VECTOR_VARIANTS] = vector_variants
+    current_app.config[CONFIG_INDEX_VARIANTS] = [
+        IndexSchema(index_client, variant.index_name) for variant in vector_variants
+    ]
+
+    # Typeahead indexes over the title lists written by prepdata.py
+    title_suggesters = {
+        data_set: TitleSuggester.load(EMBEDDING_BUNDLE_DIR, data_set)
+        for data_set in ["sample", "wikipedia"]
+    }
+    for variant in vector_variants:
+        title_suggesters[variant.name] = title_suggesters[variant.data_set]
+    current_app.config[CONFIG_TITLE_SUGGESTERS] = title_suggesters
+
+    # The "hot" list is only pre-embedded, never shown as sample cards
+    with open(SAMPLE_QUERIES_PATH, "r", encoding="utf-8") as file:
+        sample_queries = json.load(file)
+    sample_queries.pop("hot", None)
+    current_app.config[CONFIG_SAMPLE_QUERIES] = sample_queries
+
 def create_app():
     app = Quart(__name__)
+    app.json = OrjsonProvider(app)
     app.register_blueprint(bp)
     return app
@@ -0,0 +1,43 @@
+import pytest
+from quart import Response
+
+import app as backend
+from conftest import SearchClient
+from searchText import SearchText
+
+
+@pytest.fixture(scope="module")
+def quart_app():
+    return backend.create_app()
+
+
+@pytest.fixture(scope="module")
+def search_text_payload(event_loop, sample_results):
+    search_text = SearchText(SearchClient(sample_results))
+    return event_loop.run_until_complete(
+        search_text.search("query", use_semantic_captions=True, data_set="sample")
+    )
+
+
+def bench_json_encode_search_text(benchmark, quart_app, search_text_payload):
+    benchmark(quart_app.json.dumps, search_text_payload)
+
+
+def bench_json_decode_query_vector(benchmark, quart_app, search_text_body):
+    benchmark(quart_app.json.loads, search_text_body)
+
+
+def bench_gzip_response(benchmark, event_loop, quart_app, search_text_payload):
+    body = quart_app.json.dumps(search_text_payload)
+
+    async def gzip_response():
+        async with quart_app.test_request_context(
+            "/searchText", method="POST", headers={"Accept-Encoding": "gzip"}
+        ):
+            return await backend.gzip_response(
+                Response(body, mimetype="application/json")
+            )
+
+    response = event_loop.run_until_complete(gzip_response())
+    assert response.headers["Content-Encoding"] == "gzip"
+    benchmark(lambda: event_loop.run_until_complete(gzip_response()))
@@ -0,0 +1,40 @@
+import random
+
+from conftest import SearchClient, random_vector
+from searchText import SearchText
+from searchImages import SearchImages
+
+
+def bench_search_text_sample(benchmark, event_loop, sample_results):
+    search_text = SearchText(SearchClient(sample_results))
+    benchmark(
+        lambda: event_loop.run_until_complete(
+            search_text.search("query", use_semantic_captions=True, data_set="sample")
+        )
+    )
+
+
+def bench_search_text_wikipedia(benchmark, event_loop, wikipedia_results):
+    search_text = SearchText(SearchClient(wikipedia_results))
+    benchmark(
+        lambda: event_loop.run_until_complete(
+            search_text.search("query", data_set="wikipedia")
+        )
+    )
+
+
+def bench_search_images(benchmark, event_loop, image_results):
+    search_images = SearchImages(SearchClient(image_results), "", "", "")
+    query_vector = random_vector(random.Random(4), 1024)
+
+    async def embed_query_text(query):
+        return query_vector
+
+    search_images.embed_query_text = embed_query_text
+    benchmark(
+        lambda: event_loop.run_until_complete(search_images.search("query", "text"))
+    )
+
+
+def bench_decode_image_data_url(benchmark, image_data_url):
+    benchmark(SearchImages.decode_image_data_url, image_data_url)
@@ -0,0 +1,157 @@
+import os
+import sys
+import json
+import base64
+import random
+import asyncio
+import pytest
+from pytest_benchmark.utils import get_machine_id, parse_compare_fail
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCHMARKS_DIR)
+DATA_DIR = os.path.join(BACKEND_DIR, "..", "..", "data")
+BASELINES_DIR = os.path.join(BENCHMARKS_DIR, "baselines")
+sys.path.insert(0, BACKEND_DIR)
+
+# Fail on median regressions of more than this against the local baseline
+REGRESSION_LIMIT = "median:25%"
+
+
+def pytest_configure(config):
+    # Runs before pytest-benchmark reads its options, so wherever pytest is
+    # started from, baselines live next to the benchmarks
+    if config.getoption("benchmark_storage") == "file://./.benchmarks":
+        config.option.benchmark_storage = "file://" + BASELINES_DIR
+
+    # Timings only compare on the same machine, so baselines are recorded
+    # locally and the regression gate applies once this machine has one
+    machine_dir = os.path.join(BASELINES_DIR, get_machine_id())
+    has_baseline = os.path.isdir(machine_dir) and any(
+        name.endswith(".json") for name in os.listdir(machine_dir)
+    )
+    if has_baseline and not config.getoption("benchmark_compare"):
+        config.option.benchmark_compare = True
+        if not config.getoption("benchmark_compare_fail"):
+            config.option.benchmark_compare_fail = [parse_compare_fail(REGRESSION_LIMIT)]
+
+
+class Caption:
+    def __init__(self, text: str, highlights: str):
+        self.text = text
+        self.highlights = highlights
+
+
+class SearchResults:
+    def __init__(self, results: list[dict]):
+        self.results = iter(results)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self.results)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class SearchClient:
+    """Returns canned results shaped like azure-search-documents results."""
+
+    def __init__(self, results: list[dict]):
+        self.results = results
+
+    async def search(self, *args, **kwargs):
+        return SearchResults(self.results)
+
+
+def random_vector(rng: random.Random, dimensions: int) -> list[float]:
+    return [rng.uniform(-0.1, 0.1) for _ in range(dimensions)]
+
+
+@pytest.fixture(scope="session")
+def event_loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture(scope="session")
+def sample_documents():
+    with open(os.path.join(DATA_DIR, "text-sample.json"), "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+@pytest.fixture(scope="session")
+def sample_results(sample_documents):
+    rng = random.Random(0)
+    return [
+        {
+            **document,
+            "@search.score": rng.random(),
+            "@search.reranker_score": rng.random() * 4,
+            "@search.captions": [Caption(document["content"][:200], f"<b>{document['title']}</b>")],
+            "titleVector": random_vector(rng, 1536),
+            "contentVector": random_vector(rng, 1536),
+        }
+        for document in sample_documents[:10]
+    ]
+
+
+@pytest.fixture(scope="session")
+def wikipedia_results(sample_documents):
+    rng = random.Random(1)
+    return [
+        {
+            "@search.score": rng.random(),
+            "@search.reranker_score": None,
+            "@search.captions": None,
+            "vector_id": str(i),
+            "id": str(i),
+            "title": document["title"],
+            "text": document["content"] * 4,
+            "url": f"https://simple.wikipedia.org/wiki/{i}",
+            "titleVector": random_vector(rng, 1536),
+            "contentVector": random_vector(rng, 1536),
+        }
+        for i, document in enumerate(sample_documents[:10])
+    ]
+
+
+@pytest.fixture(scope="session")
+def image_results():
+    rng = random.Random(2)
+    return [
+        {
+            "@search.score": rng.random(),
+            "@search.reranker_score": None,
+            "@search.captions": None,
+            "id": f"image{i}",
+            "title": f"{i}.png",
+            "imageUrl": f"https://account.blob.core.windows.net/images/{i}.png",
+            "thumbnailUrl": f"https://account.blob.core.windows.net/images/thumbnails/256/{i}.webp",
+            "thumbnailUrlLarge": f"https://account.blob.core.windows.net/images/thumbnails/512/{i}.webp",
+        }
+        for i in range(8)
+    ]
+
+
+@pytest.fixture(scope="session")
+def image_data_url():
+    with open(os.path.join(DATA_DIR, "images", "1012.png"), "rb") as file:
+        return "data:image/png;base64," + base64.b64encode(file.read()).decode()
+
+
+@pytest.fixture(scope="session")
+def search_text_body():
+    rng = random.Random(3)
+    return json.dumps(
+        {
+            "query": "tools for software development",
+            "vectorSearch": True,
+            "hybridSearch": True,
+            "k": 10,
+            "queryVector": random_vector(rng, 1536),
+            "dataSet": "sample",
+        }
+    )
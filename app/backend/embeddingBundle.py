@@ -0,0 +1,42 @@
+import os
+import json
+import logging
+import numpy as np
+
+
+class EmbeddingBundle:
+    """Precomputed query embeddings written by scripts/prepdata.py.
+
+    A bundle is a float32 matrix saved as `<deployment>.npy` plus a
+    `<deployment>.json` file listing the query for each row.
+    """
+
+    def __init__(self, queries: list[str], vectors: np.ndarray):
+        self.vectors = vectors
+        self.rows = {query: row for row, query in enumerate(queries)}
+
+    @classmethod
+    def load(cls, bundle_dir: str, deployment: str):
+        index_path = os.path.join(bundle_dir, f"{deployment}.json")
+        vectors_path = os.path.join(bundle_dir, f"{deployment}.npy")
+        if not os.path.exists(index_path) or not os.path.exists(vectors_path):
+            return None
+
+        with open(index_path, "r", encoding="utf-8") as file:
+            queries = json.load(file)["queries"]
+        vectors = np.load(vectors_path, mmap_mode="r")
+        if vectors.dtype != np.float32 or vectors.shape[0] != len(queries):
+            logging.warning(f"Ignoring malformed embedding bundle {vectors_path}")
+            return None
+
+        return cls(queries, vectors)
+
+    def get(self, query: str) -> np.ndarray | None:
+        row = self.rows.get(query)
+        if row is None:
+            return None
+        # A plain ndarray view of the mapped row, serialized natively by OrjsonProvider
+        return np.asarray(self.vectors[row])
+
+    def __len__(self):
+        return len(self.rows)
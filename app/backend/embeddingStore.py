@@ -0,0 +1,67 @@
+import os
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+
+
+class EmbeddingStore:
+    """Persistent float32 embeddings keyed by deployment and text hash.
+
+    Backed by SQLite in WAL mode so every gunicorn worker and prepdata.py can
+    read it at the same time while writes are serialized by SQLite. Reads use
+    one connection per thread and never wait for a write in progress. The same
+    module is imported by scripts/prepdata.py, so both sides share the schema.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self.path = path
+        self.readers = threading.local()
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash BLOB NOT NULL,
+                vector BLOB NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            ) WITHOUT ROWID
+            """
+        )
+        self.connection.commit()
+
+    @staticmethod
+    def text_hash(text: str) -> bytes:
+        return hashlib.sha256(text.encode("utf-8")).digest()
+
+    def read_connection(self) -> sqlite3.Connection:
+        connection = getattr(self.readers, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5)
+            self.readers.connection = connection
+        return connection
+
+    def get(self, model: str, text: str) -> np.ndarray | None:
+        row = self.read_connection().execute(
+            "SELECT vector FROM embeddings WHERE model = ? AND text_hash = ?",
+            (model, self.text_hash(text)),
+        ).fetchone()
+        if row is None:
+            return None
+        return np.frombuffer(row[0], dtype=np.float32)
+
+    def put(self, model: str, text: str, vector: list[float] | np.ndarray):
+        blob = np.asarray(vector, dtype=np.float32).tobytes()
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+                (model, self.text_hash(text), blob),
+            )
+            self.connection.commit()
@@ -5,6 +5,10 @@ class IndexSchema:
         self.index_client = index_client
         self.index_name = index_name
 
+    async def get_field_names(self):
+        index_schema = await self.index_client.get_index(self.index_name)
+        return [field.name for field in index_schema.fields]
+
     async def get_efsearch(self):
         index_schema = await self.index_client.get_index(self.index_name)
         return index_schema.vector_search.algorithm_configurations[0].hnsw_parameters.ef_search
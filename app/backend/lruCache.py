@@ -0,0 +1,56 @@
+import time
+from collections import OrderedDict
+from typing import Any
+
+
+class LruCache:
+    """Bounded least-recently-used cache with hit and miss counters.
+
+    Entries optionally expire `ttl_seconds` after they were stored. Callers
+    record hits and misses themselves.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float | None = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Any | None:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        value, expires_time = entry
+        if expires_time is not None and expires_time < time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: Any):
+        expires_time = (
+            time.monotonic() + self.ttl_seconds if self.ttl_seconds is not None else None
+        )
+        self.entries[key] = (value, expires_time)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def remove(self, key: str):
+        self.entries.pop(key, None)
+
+    def record(self, hit: bool):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "maxEntries": self.max_entries,
+            "ttlSeconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
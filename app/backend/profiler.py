@@ -0,0 +1,137 @@
+import os
+import io
+import sys
+import time
+import asyncio
+import cProfile
+import pstats
+import threading
+from collections import Counter, deque
+
+
+class SamplingProfiler:
+    """Time-boxed stack sampler for the event loop thread of this worker.
+
+    A background thread reads the loop thread's current frame every
+    `interval` seconds, so the profiled code is never instrumented. Each
+    sample is rooted at the asyncio task that was running at the time.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, interval: float):
+        self.loop = loop
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.stacks = Counter()
+        self.stack_seconds = Counter()
+        self.samples = 0
+        self.started_time = None
+        self.stopped_time = None
+        self.stop_event = threading.Event()
+        self.sampler = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.started_time = time.time()
+        self.sampler.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.sampler.join()
+        self.stopped_time = time.time()
+
+    def run(self):
+        # Under CPU load the GIL delays samples, so each is weighted by the real gap
+        last_sample_time = time.perf_counter()
+        while not self.stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stack.append(self.current_task_name())
+            stack = tuple(reversed(stack))
+            now = time.perf_counter()
+            self.stacks[stack] += 1
+            self.stack_seconds[stack] += now - last_sample_time
+            self.samples += 1
+            last_sample_time = now
+
+    def current_task_name(self):
+        # Reading the running task of another thread's loop is safe under the GIL
+        task = asyncio.tasks._current_tasks.get(self.loop)
+        if task is None:
+            return "[event loop]"
+        coro = task.get_coro()
+        return f"[task {getattr(coro, '__qualname__', task.get_name())}]"
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{';'.join(stack)} {count}" for stack, count in self.stacks.most_common())
+
+    def speedscope(self) -> dict:
+        frames = {}
+        samples = []
+        weights = []
+        for stack, seconds in self.stack_seconds.items():
+            samples.append([frames.setdefault(name, len(frames)) for name in stack])
+            weights.append(seconds)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": [{"name": name} for name in frames]},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": f"worker {os.getpid()}",
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": self.stopped_time - self.started_time,
+                    "samples": samples,
+                    "weights": weights,
+                }
+            ],
+            "name": f"worker {os.getpid()} sampled every {self.interval * 1000:g}ms",
+            "exporter": "azure-search-comparison-tool",
+        }
+
+
+class SlowRequestProfiler:
+    """Captures cProfile statistics for requests slower than a threshold.
+
+    Only one request is profiled at a time, across all instances, because a
+    thread can only run one profiler. cProfile sees the whole event loop
+    thread, so a capture also includes work of concurrent requests.
+    """
+
+    active_profile = None
+
+    def __init__(self, threshold_ms: float, max_captures: int = 20):
+        self.threshold_ms = threshold_ms
+        self.captures = deque(maxlen=max_captures)
+
+    def begin(self):
+        if SlowRequestProfiler.active_profile is not None:
+            return None
+        profile = cProfile.Profile()
+        profile.enable()
+        SlowRequestProfiler.active_profile = profile
+        return profile
+
+    def end(self, profile: cProfile.Profile, path: str, elapsed_ms: float):
+        profile.disable()
+        if SlowRequestProfiler.active_profile is profile:
+            SlowRequestProfiler.active_profile = None
+        if elapsed_ms < self.threshold_ms:
+            return
+
+        output = io.StringIO()
+        pstats.Stats(profile, stream=output).sort_stats("cumulative").print_stats(40)
+        self.captures.append(
+            {
+                "path": path,
+                "elapsedMs": round(elapsed_ms, 1),
+                "time": time.time(),
+                "pid": os.getpid(),
+                "stats": output.getvalue(),
+            }
+        )
@@ -1,6 +1,14 @@
 import aiohttp
 from azure.search.documents.aio import SearchClient
 import base64
+import hashlib
+
+from lruCache import LruCache
+from indexSchema import IndexSchema
+
+# Image indexes created before thumbnails were added lack these fields
+IMAGE_FIELDS = ["id", "title", "imageUrl"]
+THUMBNAIL_FIELDS = ["thumbnailUrl", "thumbnailUrlLarge"]
 
 
 class SearchImages:
@@ -10,11 +18,21 @@ class SearchImages:
         visionAi_endpoint: str,
         visionAi_api_version: str,
         visionAi_key: str,
+        image_cache_size: int = 256,
+        image_url_ttl_seconds: float = 300,
+        index_schema: IndexSchema | None = None,
     ):
         self.search_client = search_client
         self.visionAi_endpoint = visionAi_endpoint
         self.visionAi_api_version = visionAi_api_version
         self.visionAi_key = visionAi_key
+        # Uploaded images are keyed by the SHA-256 of their bytes. Only the
+        # Vision service ever fetches a user-supplied URL, so the backend cannot
+        # revalidate it and URL embeddings expire after a short TTL instead
+        self.image_file_cache = LruCache(image_cache_size)
+        self.image_url_cache = LruCache(image_cache_size, image_url_ttl_seconds)
+        self.index_schema = index_schema
+        self.select_fields = None if index_schema else IMAGE_FIELDS + THUMBNAIL_FIELDS
 
     async def search(self, query: str, dataType: str):
         match dataType:
@@ -33,7 +51,7 @@ class SearchImages:
             vector=query_vector,
             top_k=8,
             vector_fields="imageVector",
-            select=["id,title,imageUrl"],
+            select=[",".join(await self.get_select_fields())],
         )
 
         results = []
@@ -56,6 +74,8 @@ class SearchImages:
                     "id": r["id"],
                     "title": r["title"],
                     "imageUrl": r["imageUrl"],
+                    "thumbnailUrl": r.get("thumbnailUrl"),
+                    "thumbnailUrlLarge": r.get("thumbnailUrlLarge"),
                 }
             )
 
@@ -64,6 +84,15 @@ class SearchImages:
             "queryVector": query_vector,
         }
 
+    async def get_select_fields(self):
+        # Selecting a field the index does not have fails the whole search
+        if self.select_fields is None:
+            field_names = await self.index_schema.get_field_names()
+            self.select_fields = IMAGE_FIELDS + [
+                field for field in THUMBNAIL_FIELDS if field in field_names
+            ]
+        return self.select_fields
+
     async def embed_query_text(self, query: str):
         async with aiohttp.ClientSession() as session:
             async with session.post(
@@ -81,8 +110,23 @@ class SearchImages:
 
                 return response_json["vector"]
             
+    @staticmethod
+    def decode_image_data_url(query: str) -> bytes:
+        return base64.b64decode(query.split(",")[1])
+
     async def embed_query_imageFile(self, query: str):
-        binaryData = base64.b64decode(query.split(",")[1])
+        binaryData = self.decode_image_data_url(query)
+        key = hashlib.sha256(binaryData).hexdigest()
+        vector = self.image_file_cache.get(key)
+        self.image_file_cache.record(vector is not None)
+        if vector is not None:
+            return vector
+
+        vector = await self.vectorize_image_file(binaryData)
+        self.image_file_cache.put(key, vector)
+        return vector
+
+    async def vectorize_image_file(self, binaryData: bytes):
         async with aiohttp.ClientSession() as session:
             async with session.post(
                 f"{self.visionAi_endpoint}computervision/retrieval:vectorizeImage?overload=stream&api-version={self.visionAi_api_version}",
@@ -101,6 +145,22 @@ class SearchImages:
 
 
     async def embed_query_imageUrl(self, query: str):
+        vector = self.image_url_cache.get(query)
+        self.image_url_cache.record(vector is not None)
+        if vector is not None:
+            return vector
+
+        vector = await self.vectorize_image_url(query)
+        self.image_url_cache.put(query, vector)
+        return vector
+
+    def cache_stats(self):
+        return {
+            "imageFile": self.image_file_cache.stats(),
+            "imageUrl": self.image_url_cache.stats(),
+        }
+
+    async def vectorize_image_url(self, query: str):
         async with aiohttp.ClientSession() as session:
             async with session.post(
                 f"{self.visionAi_endpoint}computervision/retrieval:vectorizeImage?api-version={self.visionAi_api_version}",
@@ -2,10 +2,15 @@ from typing import Any
 from azure.search.documents.aio import SearchClient
 from azure.search.documents.models import QueryType, QueryCaptionType, QueryAnswerType
 
+from vectorVariant import VectorVariant
+
 
 class SearchText:
-    def __init__(self, search_client: SearchClient):
+    def __init__(
+        self, search_client: SearchClient, vector_variant: VectorVariant | None = None
+    ):
         self.search_client = search_client
+        self.vector_variant = vector_variant
 
     async def search(
         self,
@@ -22,6 +27,12 @@ class SearchText:
     ):
         # Vectorize query
         query_vector = query_vector if use_vector_search else None
+
+        # Reduced-dimension variants share the fields of their source dataset
+        if self.vector_variant:
+            data_set = self.vector_variant.data_set
+            if query_vector:
+                query_vector = self.vector_variant.transform(query_vector)
         vector_fields = "contentVector" if use_vector_search else None
         k_vector = k if use_vector_search else None
 
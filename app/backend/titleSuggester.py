@@ -0,0 +1,133 @@
+import os
+import json
+import re
+import heapq
+from bisect import bisect_left, bisect_right
+from itertools import chain
+
+TOKEN_PATTERN = re.compile(r"\w+")
+FUZZY_ALPHABET = "abcdefghijklmnopqrstuvwxyz0123456789"
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class TitleSuggester:
+    """Prefix and fuzzy title completions from sorted in-memory arrays.
+
+    Titles whose text starts with the query rank first, followed by titles
+    containing every query word (the last one as a prefix), shortest first.
+    Words with no match are retried one edit away (transposition,
+    replacement, insertion, then deletion).
+    """
+
+    def __init__(self, titles: list[str]):
+        # Title ids follow the ranking order, so a smaller id is a better match
+        entries = sorted(
+            {(" ".join(tokenize(t)), t) for t in titles},
+            key=lambda e: (len(e[1]), e[0]),
+        )
+        self.titles = [title for _, title in entries]
+        self.title_tokens = [frozenset(normalized.split()) for normalized, _ in entries]
+
+        # Sorted by normalized text so title prefixes can be found with bisect
+        by_text = sorted(range(len(entries)), key=lambda i: entries[i][0])
+        self.normalized_titles = [entries[i][0] for i in by_text]
+        self.normalized_title_ids = by_text
+
+        tokens = sorted(
+            (token, i) for i, title_tokens in enumerate(self.title_tokens) for token in title_tokens
+        )
+        self.token_keys = [token for token, _ in tokens]
+        self.token_titles = [i for _, i in tokens]
+        # Typo variants of the word being typed are checked against every token
+        # prefix with one set lookup each, instead of a bisect each
+        self.token_set = set(self.token_keys)
+        self.token_prefixes = {
+            token[:n] for token in self.token_set for n in range(1, len(token) + 1)
+        }
+
+    @classmethod
+    def load(cls, titles_dir: str, data_set: str):
+        titles_path = os.path.join(titles_dir, f"titles-{data_set}.json")
+        if not os.path.exists(titles_path):
+            return None
+
+        with open(titles_path, "r", encoding="utf-8") as file:
+            return cls(json.load(file))
+
+    def suggest(self, query: str, top: int = 8) -> list[str]:
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        normalized_query = " ".join(terms)
+        start = bisect_left(self.normalized_titles, normalized_query)
+        end = bisect_left(self.normalized_titles, normalized_query + "\uffff")
+        matches = self.normalized_title_ids[start : min(end, start + top)]
+
+        if len(matches) < top:
+            seen = set(matches)
+            candidates = (i for i in self.match_terms(terms) if i not in seen)
+            matches += heapq.nsmallest(top - len(matches), candidates)
+
+        return [self.titles[i] for i in matches]
+
+    def match_terms(self, terms: list[str]):
+        matchers = []
+        for n, term in enumerate(terms):
+            matcher = self.match_term(term, prefix=n == len(terms) - 1)
+            if matcher is None:
+                return []
+            matchers.append(matcher)
+
+        # Only the titles of the rarest term are read; the other terms are
+        # checked against each candidate's own tokens, so common words cost nothing
+        matchers.sort(key=lambda m: m[0])
+        _, ranges, _, _ = matchers[0]
+        candidates = set(chain.from_iterable(self.token_titles[s:e] for s, e in ranges))
+        for _, _, tokens, prefixes in matchers[1:]:
+            if prefixes:
+                candidates = [
+                    i for i in candidates
+                    if any(token.startswith(prefixes) for token in self.title_tokens[i])
+                ]
+            else:
+                candidates = [i for i in candidates if not tokens.isdisjoint(self.title_tokens[i])]
+        return candidates
+
+    # Returns (title count, token ranges, matching tokens, matching prefixes)
+    def match_term(self, term: str, prefix: bool):
+        variants = [term] if self.has_token(term, prefix) else None
+        if variants is None:
+            # Try the most likely typos first and stop at the first kind that matches
+            for edits in self.edits(term):
+                variants = [v for v in edits if self.has_token(v, prefix)]
+                if variants:
+                    break
+            else:
+                return None
+
+        ranges = [self.token_range(v, prefix) for v in variants]
+        count = sum(end - start for start, end in ranges)
+        if prefix:
+            return count, ranges, None, tuple(variants)
+        return count, ranges, frozenset(variants), None
+
+    def has_token(self, token: str, prefix: bool) -> bool:
+        return token in (self.token_prefixes if prefix else self.token_set)
+
+    def token_range(self, token: str, prefix: bool):
+        start = bisect_left(self.token_keys, token)
+        if prefix:
+            return start, bisect_left(self.token_keys, token + "\uffff")
+        return start, bisect_right(self.token_keys, token)
+
+    @staticmethod
+    def edits(term: str):
+        splits = [(term[:i], term[i:]) for i in range(len(term) + 1)]
+        yield {a + b[1] + b[0] + b[2:] for a, b in splits if len(b) > 1}
+        yield {a + c + b[1:] for a, b in splits if b for c in FUZZY_ALPHABET} - {term}
+        yield {a + c + b for a, b in splits for c in FUZZY_ALPHABET}
+        yield {a + b[1:] for a, b in splits if b and len(term) > 1}
@@ -0,0 +1,46 @@
+import os
+import json
+import numpy as np
+
+
+class VectorVariant:
+    """A reduced-dimension copy of a text index built by scripts/prepdata.py.
+
+    Query vectors must be transformed the same way as the indexed vectors:
+    "truncate" keeps the leading dimensions and "pca" projects onto the
+    principal components stored next to the variants manifest.
+    """
+
+    def __init__(self, details: dict, mean: np.ndarray | None = None, components: np.ndarray | None = None):
+        self.details = details
+        self.name = details["name"]
+        self.data_set = details["dataSet"]
+        self.index_name = details["indexName"]
+        self.kind = details["kind"]
+        self.dimensions = details["dimensions"]
+        self.mean = mean
+        self.components = components
+
+    @classmethod
+    def load_all(cls, variants_dir: str):
+        variants_path = os.path.join(variants_dir, "variants.json")
+        if not os.path.exists(variants_path):
+            return []
+
+        with open(variants_path, "r", encoding="utf-8") as file:
+            variants = json.load(file)
+
+        loaded = []
+        for details in variants:
+            if details["kind"] == "pca":
+                projection = np.load(os.path.join(variants_dir, details["projection"]))
+                loaded.append(cls(details, projection["mean"], projection["components"]))
+            else:
+                loaded.append(cls(details))
+        return loaded
+
+    def transform(self, vector: list[float]) -> list[float]:
+        if self.kind == "truncate":
+            return vector[: self.dimensions]
+        query_vector = np.asarray(vector, dtype=np.float32)
+        return ((query_vector - self.mean) @ self.components.T).tolist()
@@ -0,0 +1,7 @@
+import axios from "axios";
+import { DataSet } from "./types";
+
+export const getDataSets = async (): Promise<DataSet[]> => {
+    const response = await axios.get<DataSet[]>("/getDataSets");
+    return response.data;
+};
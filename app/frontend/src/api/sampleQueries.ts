@@ -0,0 +1,7 @@
+import axios from "axios";
+
+// Sample cards per dataset, the same list the backend pre-embeds
+export const getSampleQueries = async (): Promise<Record<string, string[]>> => {
+    const response = await axios.get<Record<string, string[]>>("/getSampleQueries");
+    return response.data;
+};
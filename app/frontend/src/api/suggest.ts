@@ -0,0 +1,6 @@
+import axios from "axios";
+
+export const getSuggestions = async (query: string, dataSet: string): Promise<string[]> => {
+    const response = await axios.get<string[]>("/suggest", { params: { q: query, dataSet } });
+    return response.data;
+};
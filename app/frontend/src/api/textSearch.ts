@@ -1,5 +1,5 @@
 import axios from "axios";
-import { SearchResponse, TextSearchRequest, TextSearchResult } from "./types";
+import { ApproachKey, SearchResponse, TextSearchRequest, TextSearchResult, TextSearchStreamError, TextSearchStreamRequest, TextSearchStreamResult } from "./types";
 
 export const getTextSearchResults = async (
     approach: "text" | "vec" | "hs" | "hssr" | undefined,
@@ -43,3 +43,64 @@ export const getEmbeddings = async (query: string): Promise<number[]> => {
     const response = await axios.post<number[]>("/embedQuery", { query });
     return response.data;
 };
+
+// Reads the /searchTextStream server-sent events, calling onResult as each approach completes
+export const streamTextSearchResults = async (
+    approaches: ApproachKey[],
+    searchQuery: string,
+    useSemanticCaptions: boolean,
+    onResult: (approachKey: ApproachKey, results: TextSearchResult[]) => void,
+    onError: (approachKey: ApproachKey, error: string) => void,
+    dataSet?: string,
+    queryVector?: number[]
+): Promise<void> => {
+    const requestBody: TextSearchStreamRequest = {
+        query: searchQuery,
+        approaches,
+        useSemanticCaptions,
+        queryVector,
+        dataSet
+    };
+
+    const response = await fetch("/searchTextStream", {
+        method: "POST",
+        headers: { "Content-Type": "application/json", Accept: "text/event-stream" },
+        body: JSON.stringify(requestBody)
+    });
+    if (!response.ok || !response.body) {
+        const data = (await response.json().catch(() => undefined)) as { error?: string } | undefined;
+        throw new Error(data?.error ?? `Search failed with status ${response.status}`);
+    }
+
+    const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+    let buffer = "";
+    for (;;) {
+        const { value, done } = await reader.read();
+        if (done) {
+            return;
+        }
+        buffer += value;
+
+        let boundary = buffer.indexOf("\n\n");
+        while (boundary !== -1) {
+            const lines = buffer.slice(0, boundary).split("\n");
+            buffer = buffer.slice(boundary + 2);
+            boundary = buffer.indexOf("\n\n");
+
+            const eventName = lines.find(line => line.startsWith("event: "))?.slice(7);
+            const data = lines
+                .filter(line => line.startsWith("data: "))
+                .map(line => line.slice(6))
+                .join("\n");
+            if (eventName === "result") {
+                const event = JSON.parse(data) as TextSearchStreamResult;
+                onResult(event.approach, event.results);
+            } else if (eventName === "error") {
+                const event = JSON.parse(data) as TextSearchStreamError;
+                onError(event.approach, event.error);
+            } else if (eventName === "done") {
+                return;
+            }
+        }
+    }
+};
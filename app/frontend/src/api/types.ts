@@ -18,6 +18,14 @@ export interface TextSearchRequest {
     dataSet?: string;
 }
 
+export interface TextSearchStreamRequest {
+    query: string;
+    approaches: ApproachKey[];
+    useSemanticCaptions?: boolean;
+    queryVector?: number[];
+    dataSet?: string;
+}
+
 export interface ImageSearchRequest {
     query: string;
     dataType: string;
@@ -48,15 +56,38 @@ export interface TextSearchResult extends SearchResult {
     url?: string;
 }
 
+export interface TextSearchStreamResult extends SearchResponse<TextSearchResult> {
+    approach: ApproachKey;
+    elapsedMs: number;
+}
+
+export interface TextSearchStreamError {
+    approach: ApproachKey;
+    error: string;
+}
+
 export interface ImageSearchResult extends SearchResult {
     id: string;
     title: string;
     imageUrl: string;
+    thumbnailUrl?: string;
+    thumbnailUrlLarge?: string;
 }
 
 export interface ResultCard {
     approachKey: string;
     searchResults: TextSearchResult[];
+    elapsedMs?: number;
+}
+
+export interface DataSet {
+    key: string;
+    dataSet: string;
+    dimensions: number;
+    kind?: string;
+    vectorBytes?: number;
+    documents?: number;
+    buildSeconds?: number | null;
 }
 
 export interface AxiosErrorResponseData {
@@ -218,7 +218,12 @@ export const ImagePage = () => {
                 {searchResults.map(x => (
                     <Stack key={x.id} className={styles.imageSearchResultCard}>
                         <div className={styles.imageContainer}>
-                            <img src={x.imageUrl} alt={x.title} />
+                            <img
+                                src={x.thumbnailUrl ?? x.imageUrl}
+                                srcSet={x.thumbnailUrl && x.thumbnailUrlLarge ? `${x.thumbnailUrl} 1x, ${x.thumbnailUrlLarge} 2x` : undefined}
+                                alt={x.title}
+                                loading="lazy"
+                            />
                         </div>
                     </Stack>
                 ))}
@@ -1,16 +1,19 @@
-import React, { useState, useCallback, useMemo, useEffect } from "react";
+import React, { useState, useCallback, useMemo, useEffect, useRef } from "react";
 import { Checkbox, DefaultButton, Dropdown, IDropdownOption, MessageBar, MessageBarType, Panel, Spinner, Stack, TextField, Toggle } from "@fluentui/react";
 import { DismissCircle24Filled, Search24Regular, Settings20Regular } from "@fluentui/react-icons";
 
 import styles from "./Vector.module.css";
 
-import { TextSearchResult, Approach, ResultCard, ApproachKey, AxiosErrorResponseData } from "../../api/types";
-import { getEmbeddings, getTextSearchResults } from "../../api/textSearch";
+import { TextSearchResult, Approach, ResultCard, ApproachKey, DataSet } from "../../api/types";
+import { getEmbeddings, streamTextSearchResults } from "../../api/textSearch";
 import SampleCard from "../../components/SampleCards";
-import { AxiosError } from "axios";
 import { getEfSearch, updateEfSearch } from "../../api/indexSchema";
+import { getDataSets } from "../../api/dataSets";
+import { getSuggestions } from "../../api/suggest";
+import { getSampleQueries } from "../../api/sampleQueries";
 
 const MaxSelectedModes = 4;
+const SuggestDebounceMs = 150;
 
 const Vector: React.FC = () => {
     const [searchQuery, setSearchQuery] = useState<string>("");
@@ -26,6 +29,13 @@ const Vector: React.FC = () => {
     const [efSearch, setEfSearch] = React.useState<string>("");
     const [validationError, setValidationError] = React.useState<string>("");
     const [selectedDatasetKey, setSelectedDatasetKey] = React.useState<string>("sample");
+    const [dataSets, setDataSets] = React.useState<DataSet[]>([]);
+    const [suggestions, setSuggestions] = React.useState<string[]>([]);
+    const [allSampleQueries, setAllSampleQueries] = React.useState<Record<string, string[]>>({});
+    const [recalls, setRecalls] = React.useState<Partial<Record<ApproachKey, number>>>({});
+    const latestSearchRef = useRef<number>(0);
+    const latestSuggestRef = useRef<number>(0);
+    const suggestTimeoutRef = useRef<number>();
 
     const approaches: Approach[] = useMemo(
         () => [
@@ -37,20 +47,34 @@ const Vector: React.FC = () => {
         []
     );
 
-    const Datasets: IDropdownOption[] = useMemo(
-        () => [
+    const Datasets: IDropdownOption[] = useMemo(() => {
+        const baseDatasets: IDropdownOption[] = [
             { key: "sample", text: "Azure Services", title: "Sample text data" },
             { key: "wikipedia", text: "Wikipedia Articles", title: "Wikipedia articles data" }
-        ],
-        []
-    );
+        ];
+        const variants: IDropdownOption[] = dataSets
+            .filter(d => d.kind)
+            .map(d => ({
+                key: d.key,
+                text: `${baseDatasets.find(b => b.key === d.dataSet)?.text ?? d.dataSet} (${d.kind} ${d.dimensions})`,
+                title: `${d.dimensions} dimensions, ${d.vectorBytes} bytes per vector, ${d.documents} documents indexed${d.buildSeconds != null ? ` in ${d.buildSeconds}s` : ""}`
+            }));
+        return [...baseDatasets, ...variants];
+    }, [dataSets]);
+
+    // Reduced-dimension variants have the same documents as their source dataset
+    const baseDatasetKey = dataSets.find(d => d.key === selectedDatasetKey)?.dataSet ?? selectedDatasetKey;
 
-    let sampleQueries: string[] = [];
-    if (selectedDatasetKey === "sample") {
-        sampleQueries = ["tools for software development", "herramientas para el desarrollo de software", "scalable storage solution"];
-    } else if (selectedDatasetKey === "wikipedia") {
-        sampleQueries = ["species of tigers", "world history", "global delicious food"];
-    }
+    const sampleQueries = allSampleQueries[baseDatasetKey] ?? [];
+
+    useEffect(() => {
+        getDataSets()
+            .then(setDataSets)
+            .catch(e => setErrors([`Failed to get datasets ${String(e)}`]));
+        getSampleQueries()
+            .then(setAllSampleQueries)
+            .catch(e => setErrors([`Failed to get sample queries ${String(e)}`]));
+    }, []);
 
     useEffect(() => {
         if (searchQuery === "") {
@@ -71,6 +95,33 @@ const Vector: React.FC = () => {
         }
     }, [efSearch, efSearchInSchema, searchQuery]);
 
+    const measureRecall = useCallback(
+        (
+            searchId: number,
+            searchApproachKeys: ApproachKey[],
+            query: string,
+            queryVector: number[],
+            variantResults: Partial<Record<ApproachKey, TextSearchResult[]>>
+        ) =>
+            streamTextSearchResults(
+                searchApproachKeys,
+                query,
+                useSemanticCaptions,
+                (approachKey, sourceResults) => {
+                    if (searchId !== latestSearchRef.current || !sourceResults.length) {
+                        return;
+                    }
+                    const returnedIds = new Set((variantResults[approachKey] ?? []).map(r => r.id));
+                    const recall = sourceResults.filter(r => returnedIds.has(r.id)).length / sourceResults.length;
+                    setRecalls(current => ({ ...current, [approachKey]: recall }));
+                },
+                () => undefined,
+                baseDatasetKey,
+                queryVector
+            ).catch(() => undefined),
+        [useSemanticCaptions, baseDatasetKey]
+    );
+
     const executeSearch = useCallback(
         async (query: string) => {
             if (query.length === 0) {
@@ -78,7 +129,9 @@ const Vector: React.FC = () => {
                 return;
             }
             setTextQueryVector([]);
+            setRecalls({});
             setLoading(true);
+            const searchId = ++latestSearchRef.current;
 
             let searchApproachKeys = selectedApproachKeys;
             if (selectedApproachKeys.length === 0) {
@@ -86,7 +139,6 @@ const Vector: React.FC = () => {
             }
             setSelectedApproachKeys(searchApproachKeys);
 
-            let resultsList: ResultCard[] = [];
             let searchErrors: string[] = [];
             let queryVector: number[] = [];
 
@@ -114,35 +166,46 @@ const Vector: React.FC = () => {
                 }
             }
 
-            Promise.allSettled(
-                searchApproachKeys.map(async approachKey => {
-                    const results = await getTextSearchResults(approachKey, query, useSemanticCaptions, selectedDatasetKey, queryVector);
-                    const searchResults = results.results;
+            // Columns render as each approach completes, in the order the approaches were selected
+            const startTime = performance.now();
+            const variantResults: Partial<Record<ApproachKey, TextSearchResult[]>> = {};
+            setResultCards([]);
+            streamTextSearchResults(
+                searchApproachKeys,
+                query,
+                useSemanticCaptions,
+                (approachKey, searchResults) => {
+                    variantResults[approachKey] = searchResults;
                     const resultCard: ResultCard = {
                         approachKey,
-                        searchResults
+                        searchResults,
+                        elapsedMs: performance.now() - startTime
                     };
-                    return resultCard;
-                })
+                    setResultCards(cards =>
+                        [...cards, resultCard].sort(
+                            (a, b) => searchApproachKeys.indexOf(a.approachKey as ApproachKey) - searchApproachKeys.indexOf(b.approachKey as ApproachKey)
+                        )
+                    );
+                },
+                (_approachKey, error) => {
+                    searchErrors = [error, ...searchErrors];
+                    setErrors(searchErrors);
+                },
+                selectedDatasetKey,
+                queryVector
             )
-                .then(results => {
-                    const promiseResultsList = results.filter(result => result.status === "fulfilled") as PromiseFulfilledResult<ResultCard>[];
-                    resultsList = promiseResultsList.map(r => r.value);
-                    const errors = results.filter(result => result.status === "rejected") as PromiseRejectedResult[];
-                    errors.map(e => {
-                        const err = e.reason as AxiosError;
-                        const data = err.response?.data as AxiosErrorResponseData;
-                        data ? (searchErrors = [`${String(data.error)}`, ...searchErrors]) : (searchErrors = [`${err.message}`, ...searchErrors]);
-                    });
-                })
                 .catch(e => (searchErrors = searchErrors.concat(String(e))))
                 .finally(() => {
-                    setResultCards(resultsList);
                     setErrors(searchErrors);
                     setLoading(false);
+                    // A variant's recall is the share of its full-dimension source's results it also
+                    // returned. The source is queried afterwards so it cannot skew the latencies above.
+                    if (baseDatasetKey !== selectedDatasetKey) {
+                        void measureRecall(searchId, searchApproachKeys, query, queryVector, variantResults);
+                    }
                 });
         },
-        [selectedApproachKeys, efSearch, efSearchInSchema, useSemanticCaptions, selectedDatasetKey]
+        [selectedApproachKeys, efSearch, efSearchInSchema, useSemanticCaptions, selectedDatasetKey, baseDatasetKey, measureRecall]
     );
 
     const handleOnKeyDown = useCallback(
@@ -160,9 +223,30 @@ const Vector: React.FC = () => {
         void executeSearch(query);
     };
 
-    const handleOnChange = useCallback((_ev: React.FormEvent<HTMLInputElement | HTMLTextAreaElement>, newValue?: string) => {
-        setSearchQuery(newValue ?? "");
-    }, []);
+    const handleOnChange = useCallback(
+        (_ev: React.FormEvent<HTMLInputElement | HTMLTextAreaElement>, newValue?: string) => {
+            setSearchQuery(newValue ?? "");
+            // Only the latest keystroke's suggestions are shown, whatever order the replies arrive in
+            const suggestId = ++latestSuggestRef.current;
+            window.clearTimeout(suggestTimeoutRef.current);
+            if (!newValue) {
+                setSuggestions([]);
+                return;
+            }
+            suggestTimeoutRef.current = window.setTimeout(() => {
+                void getSuggestions(newValue, selectedDatasetKey)
+                    .catch(() => [])
+                    .then(results => {
+                        if (suggestId === latestSuggestRef.current) {
+                            setSuggestions(results);
+                        }
+                    });
+            }, SuggestDebounceMs);
+        },
+        [selectedDatasetKey]
+    );
+
+    useEffect(() => () => window.clearTimeout(suggestTimeoutRef.current), []);
 
     const onApproachChange = useCallback(
         (_ev?: React.FormEvent<HTMLElement | HTMLInputElement>, checked?: boolean, approach?: Approach) => {
@@ -194,6 +278,7 @@ const Vector: React.FC = () => {
 
     const onDatasetChange = React.useCallback((_event: React.FormEvent<HTMLDivElement>, item?: IDropdownOption): void => {
         setResultCards([]);
+        setRecalls({});
         setSelectedDatasetKey(String(item?.key) ?? "sample");
     }, []);
 
@@ -210,7 +295,14 @@ const Vector: React.FC = () => {
                     placeholder="Type something here (e.g. networking services)"
                     onChange={handleOnChange}
                     onKeyDown={handleOnKeyDown}
+                    list="title-suggestions"
+                    autoComplete="off"
                 />
+                <datalist id="title-suggestions">
+                    {suggestions.map(suggestion => (
+                        <option key={suggestion} value={suggestion} />
+                    ))}
+                </datalist>
                 <Settings20Regular onClick={() => setIsConfigPanelOpen(!isConfigPanelOpen)} />
                 {searchQuery.length > 0 && <DismissCircle24Filled onClick={() => setSearchQuery("")} />}
             </Stack>
@@ -234,7 +326,12 @@ const Vector: React.FC = () => {
                         <Stack horizontal tokens={{ childrenGap: "12px" }}>
                             {resultCards.map(resultCard => (
                                 <div key={resultCard.approachKey} className={styles.resultCardContainer}>
-                                    <p className={styles.approach}>{approaches.find(a => a.key === resultCard.approachKey)?.title} </p>
+                                    <p className={styles.approach}>
+                                        {approaches.find(a => a.key === resultCard.approachKey)?.title}
+                                        {!hideScores && resultCard.elapsedMs !== undefined && ` (${resultCard.elapsedMs.toFixed(0)} ms)`}
+                                        {recalls[resultCard.approachKey as ApproachKey] !== undefined &&
+                                            ` (recall ${((recalls[resultCard.approachKey as ApproachKey] ?? 0) * 100).toFixed(0)}%)`}
+                                    </p>
                                     {!resultCard.searchResults.length && <p className={styles.searchResultCardTitle}>{"No results found"} </p>}
                                     {resultCard.searchResults.map((result: TextSearchResult) => (
                                         <Stack horizontal className={styles.searchResultCard} key={result.id}>
@@ -242,7 +339,7 @@ const Vector: React.FC = () => {
                                                 <Stack horizontal horizontalAlign="space-between">
                                                     <div className={styles.titleContainer}>
                                                         <p className={styles.searchResultCardTitle}>{result.title} </p>
-                                                        {selectedDatasetKey === "sample" && <p className={styles.category}>{result.category}</p>}
+                                                        {baseDatasetKey === "sample" && <p className={styles.category}>{result.category}</p>}
                                                     </div>
                                                     {!hideScores && (
                                                         <div className={styles.scoreContainer}>
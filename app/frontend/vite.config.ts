@@ -1,10 +1,44 @@
-import { defineConfig } from "vite";
+import { defineConfig, Plugin } from "vite";
 import react from "@vitejs/plugin-react";
 import basicSsl from "@vitejs/plugin-basic-ssl";
+import { readdirSync, readFileSync, statSync, writeFileSync } from "fs";
+import { join, resolve } from "path";
+import { brotliCompressSync, constants, gzipSync } from "zlib";
+
+// Writes .br and .gz siblings of the built assets, so the backend can serve them without compressing on every request
+const precompress = (): Plugin => {
+    let outDir = "";
+    const listFiles = (dir: string): string[] =>
+        readdirSync(dir).flatMap(name => {
+            const path = join(dir, name);
+            return statSync(path).isDirectory() ? listFiles(path) : [path];
+        });
+
+    return {
+        name: "precompress",
+        apply: "build",
+        configResolved(config) {
+            outDir = resolve(config.root, config.build.outDir);
+        },
+        closeBundle() {
+            for (const file of listFiles(outDir)) {
+                if (!/\.(js|css|html|svg|json)$/.test(file)) {
+                    continue;
+                }
+                const content = readFileSync(file);
+                if (content.length < 500) {
+                    continue;
+                }
+                writeFileSync(`${file}.gz`, gzipSync(content, { level: 9 }));
+                writeFileSync(`${file}.br`, brotliCompressSync(content, { params: { [constants.BROTLI_PARAM_QUALITY]: 11 } }));
+            }
+        }
+    };
+};
 
 // https://vitejs.dev/config/
 export default defineConfig({
-    plugins: [react(), basicSsl()],
+    plugins: [react(), basicSsl(), precompress()],
     build: {
         outDir: "../backend/static",
         emptyOutDir: true,
@@ -13,10 +47,14 @@ export default defineConfig({
     server: {
         proxy: {
             "/searchText": "http://127.0.0.1:5000",
+            "/searchTextStream": "http://127.0.0.1:5000",
             "/searchImages": "http://127.0.0.1:5000",
             "/embedQuery": "http://127.0.0.1:5000",
             "/getEfSearch": "http://127.0.0.1:5000",
-            "/updateEfSearch": "http://127.0.0.1:5000"
+            "/updateEfSearch": "http://127.0.0.1:5000",
+            "/getDataSets": "http://127.0.0.1:5000",
+            "/getSampleQueries": "http://127.0.0.1:5000",
+            "/suggest": "http://127.0.0.1:5000"
         }
     }
 });
@@ -0,0 +1,334 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import openai
+from tenacity import retry, wait_random_exponential, stop_after_attempt
+from azure.identity import DefaultAzureCredential
+
+# The embedding store is shared with the backend, which owns its schema
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "app", "backend"))
+from embeddingStore import EmbeddingStore
+
+AZURE_OPENAI_SERVICE = os.environ.get("AZURE_OPENAI_SERVICE")
+AZURE_OPENAI_DEPLOYMENT_NAME = (
+    os.environ.get("AZURE_OPENAI_DEPLOYMENT_NAME") or "embedding"
+)
+
+EMBEDDING_STORE_PATH = os.environ.get("EMBEDDING_STORE_PATH") or os.path.join(
+    "app/backend/embeddings", "embeddings.sqlite"
+)
+SAMPLE_DATA_PATH = "data/text-sample.json"
+
+# Index vector field and the document text it embeds
+VECTOR_FIELDS = {"contentVector": "content", "titleVector": "title"}
+
+# Below this many queries starting worker processes costs more than it saves
+POOL_MIN_QUERIES = 4096
+
+# Set in each scoring process by init_scoring
+scoring_state = {}
+
+
+def load_queries(path: str):
+    queries = []
+    with open(path, "r", encoding="utf-8") as file:
+        for i, line in enumerate(file):
+            line = line.strip()
+            if not line:
+                continue
+            if path.endswith(".jsonl"):
+                query = json.loads(line)
+                queries.append((str(query.get("id", i)), query["query"]))
+            else:
+                queries.append((str(i), line))
+    return queries
+
+
+# Embeddings come from the store shared with prepdata.py and the backend, so
+# only texts that were never embedded before cost an Azure OpenAI call
+def embed_texts(texts: list[str], concurrency: int):
+    vectors = [embedding_store.get(AZURE_OPENAI_DEPLOYMENT_NAME, text) for text in texts]
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    if missing:
+        print(f"Generating Azure OpenAI embeddings for {len(missing)} texts...")
+        connect_openai()
+
+        def embed_text(i):
+            vector = request_text_embeddings(texts[i])
+            embedding_store.put(AZURE_OPENAI_DEPLOYMENT_NAME, texts[i], vector)
+            vectors[i] = np.asarray(vector, dtype=np.float32)
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(embed_text, missing))
+
+    return normalize(np.stack(vectors).astype(np.float32))
+
+
+def normalize(vectors: np.ndarray):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def connect_openai():
+    if openai.api_key:
+        return
+    azure_credential = DefaultAzureCredential(
+        exclude_shared_token_cache_credential=True
+    )
+    openai.api_base = f"https://{AZURE_OPENAI_SERVICE}.openai.azure.com"
+    openai.api_version = "2023-05-15"
+    openai.api_type = "azure_ad"
+    openai.api_key = azure_credential.get_token(
+        "https://cognitiveservices.azure.com/.default"
+    ).token
+
+
+@retry(wait=wait_random_exponential(min=1, max=60), stop=stop_after_attempt(15))
+def request_text_embeddings(text):
+    response = openai.Embedding.create(input=text, engine=AZURE_OPENAI_DEPLOYMENT_NAME)
+    return response["data"][0]["embedding"]
+
+
+# Cosine top-k of every query against every document. Documents are scored a
+# block at a time and merged into the running top-k with a partial sort, so
+# memory stays at queries x (top + block_size) however large the dataset is.
+def top_k(queries: np.ndarray, documents: np.ndarray, top: int, block_size: int):
+    top = min(top, len(documents))
+    best_scores = np.empty((len(queries), 0), dtype=np.float32)
+    best_indices = np.empty((len(queries), 0), dtype=np.int64)
+    for start in range(0, len(documents), block_size):
+        block = documents[start : start + block_size]
+        scores = np.concatenate([best_scores, queries @ block.T], axis=1)
+        indices = np.concatenate(
+            [
+                best_indices,
+                np.broadcast_to(
+                    np.arange(start, start + len(block)), (len(queries), len(block))
+                ),
+            ],
+            axis=1,
+        )
+        if scores.shape[1] > top:
+            keep = np.argpartition(-scores, top - 1, axis=1)[:, :top]
+            scores = np.take_along_axis(scores, keep, axis=1)
+            indices = np.take_along_axis(indices, keep, axis=1)
+        best_scores, best_indices = scores, indices
+
+    # Equal scores are ordered by document position, so output is deterministic
+    order = np.lexsort((best_indices, -best_scores), axis=1)
+    return (
+        np.take_along_axis(best_indices, order, axis=1),
+        np.take_along_axis(best_scores, order, axis=1),
+    )
+
+
+# Matrices are passed as .npy paths to worker processes, which memory-map them
+# instead of each receiving a pickled copy
+def init_scoring(documents, queries, query_ids, query_texts, document_ids, document_titles, options):
+    scoring_state["documents"] = (
+        np.load(documents, mmap_mode="r") if isinstance(documents, str) else documents
+    )
+    scoring_state["queries"] = (
+        np.load(queries, mmap_mode="r") if isinstance(queries, str) else queries
+    )
+    scoring_state["query_ids"] = query_ids
+    scoring_state["query_texts"] = query_texts
+    scoring_state["document_ids"] = document_ids
+    scoring_state["document_titles"] = document_titles
+    scoring_state.update(options)
+
+
+# Scores queries[start:stop] and returns their JSONL lines
+def score_query_block(start: int, stop: int):
+    top = scoring_state["top"]
+    exclude_self = scoring_state["exclude_self"]
+    document_ids = scoring_state["document_ids"]
+    document_titles = scoring_state["document_titles"]
+
+    # One extra candidate leaves room to drop the query document itself
+    indices, scores = top_k(
+        np.asarray(scoring_state["queries"][start:stop]),
+        scoring_state["documents"],
+        top + 1 if exclude_self else top,
+        scoring_state["block_size"],
+    )
+
+    lines = []
+    for row, i in enumerate(range(start, stop)):
+        results = [
+            {
+                "id": document_ids[j],
+                "title": document_titles[j],
+                "score": round(float(score), 6),
+            }
+            for j, score in zip(indices[row], scores[row])
+            if not (exclude_self and document_ids[j] == scoring_state["query_ids"][i])
+        ][:top]
+        lines.append(
+            json.dumps(
+                {
+                    "id": scoring_state["query_ids"][i],
+                    "query": scoring_state["query_texts"][i],
+                    "results": results,
+                }
+            )
+        )
+    return "\n".join(lines) + "\n"
+
+
+def score_queries(
+    documents: np.ndarray,
+    queries: np.ndarray,
+    query_ids: list[str],
+    query_texts: list[str],
+    document_ids: list[str],
+    document_titles: list[str],
+    options: dict,
+    processes: int,
+    output_path: str,
+):
+    block_size = options["block_size"]
+    blocks = [(start, min(start + block_size, len(queries))) for start in range(0, len(queries), block_size)]
+    started_time = time.time()
+    last_report_time = started_time
+    scored = 0
+
+    with open(output_path, "w", encoding="utf-8") as output, tempfile.TemporaryDirectory() as temp_dir:
+        if processes > 1 and len(queries) >= POOL_MIN_QUERIES:
+            documents_path = os.path.join(temp_dir, "documents.npy")
+            queries_path = os.path.join(temp_dir, "queries.npy")
+            np.save(documents_path, documents)
+            np.save(queries_path, queries)
+
+            # Each worker already gets a core, so keep BLAS from starting more threads
+            for variable in ["OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"]:
+                os.environ[variable] = "1"
+            print(f"Scoring {len(queries)} queries with {processes} processes")
+            executor = ProcessPoolExecutor(
+                max_workers=processes,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_scoring,
+                initargs=(documents_path, queries_path, query_ids, query_texts, document_ids, document_titles, options),
+            )
+            chunks = executor.map(score_query_block, *zip(*blocks))
+        else:
+            print(f"Scoring {len(queries)} queries")
+            executor = None
+            init_scoring(documents, queries, query_ids, query_texts, document_ids, document_titles, options)
+            chunks = (score_query_block(start, stop) for start, stop in blocks)
+
+        # Blocks are written in query order as soon as they are scored
+        try:
+            for (start, stop), chunk in zip(blocks, chunks):
+                output.write(chunk)
+                scored += stop - start
+                if time.time() - last_report_time >= 10:
+                    last_report_time = time.time()
+                    print(f"Scored {scored}/{len(queries)} queries ({scored / (last_report_time - started_time):.0f}/s)")
+        finally:
+            if executor:
+                executor.shutdown(cancel_futures=True)
+
+    elapsed = max(time.time() - started_time, 1e-6)
+    print(f"Scored {scored} queries in {elapsed:.1f}s ({scored / elapsed:.0f}/s), written to {output_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Scores a set of queries against the vectors of the sample dataset and writes the top matches as JSONL",
+    )
+    parser.add_argument(
+        "--queries",
+        required=False,
+        help="Optional. Text file with one query per line, or JSONL with query and optional id fields",
+    )
+    parser.add_argument(
+        "--near-duplicates",
+        required=False,
+        action="store_true",
+        help="Optional. Use the sample documents themselves as the queries, excluding each document from its own results",
+    )
+    parser.add_argument(
+        "--field",
+        required=False,
+        choices=list(VECTOR_FIELDS),
+        default="contentVector",
+        help="Optional. Document vector field to score against",
+    )
+    parser.add_argument(
+        "--top",
+        required=False,
+        type=int,
+        default=10,
+        help="Optional. Number of matches to keep per query",
+    )
+    parser.add_argument(
+        "--block-size",
+        required=False,
+        type=int,
+        default=1024,
+        help="Optional. Number of queries and documents multiplied per block",
+    )
+    parser.add_argument(
+        "--processes",
+        required=False,
+        type=int,
+        default=os.cpu_count(),
+        help=f"Optional. Worker processes for query sets of {POOL_MIN_QUERIES} or more",
+    )
+    parser.add_argument(
+        "--concurrency",
+        required=False,
+        type=int,
+        default=4,
+        help="Optional. Number of parallel requests for texts missing from the embedding store",
+    )
+    parser.add_argument(
+        "--output",
+        required=True,
+        help="Path of the JSONL file to write",
+    )
+    args = parser.parse_args()
+    if bool(args.queries) == args.near_duplicates:
+        parser.error("pass either --queries or --near-duplicates")
+    if args.queries:
+        loaded_queries = load_queries(args.queries)
+        if not loaded_queries:
+            parser.error(f"--queries file {args.queries} contains no queries")
+
+    embedding_store = EmbeddingStore(EMBEDDING_STORE_PATH)
+
+    with open(SAMPLE_DATA_PATH, "r", encoding="utf-8") as file:
+        sample_documents = json.load(file)
+    document_ids = [d["id"] for d in sample_documents]
+    document_titles = [d["title"] for d in sample_documents]
+    document_texts = [d[VECTOR_FIELDS[args.field]] for d in sample_documents]
+
+    print(f"Loading {args.field} of {len(sample_documents)} sample documents")
+    documents = embed_texts(document_texts, args.concurrency)
+
+    if args.near_duplicates:
+        query_ids, query_texts, queries = document_ids, document_texts, documents
+    else:
+        query_ids, query_texts = map(list, zip(*loaded_queries))
+        print(f"Loading embeddings of {len(query_texts)} queries")
+        queries = embed_texts(query_texts, args.concurrency)
+
+    score_queries(
+        documents,
+        queries,
+        query_ids,
+        query_texts,
+        document_ids,
+        document_titles,
+        {"top": args.top, "block_size": args.block_size, "exclude_self": args.near_duplicates},
+        args.processes,
+        args.output,
+    )
@@ -1,19 +1,26 @@
 import argparse
 import base64
+import hashlib
 import os
 import json
 import random
 import string
+import sys
+import threading
 import time
 import requests
 import uuid
 import wget
+import numpy as np
 import pandas as pd
 import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from io import BytesIO
+from PIL import Image
 
 import openai
 from tenacity import retry, wait_random_exponential, stop_after_attempt
-from azure.storage.blob import BlobServiceClient
+from azure.storage.blob import BlobServiceClient, ContentSettings
 from azure.identity import DefaultAzureCredential
 from azure.search.documents import SearchClient
 from azure.search.documents.indexes import SearchIndexClient
@@ -32,6 +39,10 @@ from azure.search.documents.indexes.models import (
     VectorSearchAlgorithmConfiguration,
 )
 
+# The embedding store is shared with the backend, which owns its schema
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "app", "backend"))
+from embeddingStore import EmbeddingStore
+
 AZURE_OPENAI_SERVICE = os.environ.get("AZURE_OPENAI_SERVICE")
 AZURE_OPENAI_DEPLOYMENT_NAME = (
     os.environ.get("AZURE_OPENAI_DEPLOYMENT_NAME") or "embedding"
@@ -48,26 +59,79 @@ AZURE_SEARCH_WIKIPEDIA_INDEX_NAME = os.environ.get("AZURE_SEARCH_WIKIPEDIA_INDEX
 AZURE_STORAGE_ACCOUNT = os.environ.get("AZURE_STORAGE_ACCOUNT")
 AZURE_STORAGE_CONTAINER = os.environ.get("AZURE_STORAGE_CONTAINER")
 
+EMBEDDING_BUNDLE_DIR = "app/backend/embeddings"
+EMBEDDING_STORE_PATH = os.environ.get("EMBEDDING_STORE_PATH") or os.path.join(
+    EMBEDDING_BUNDLE_DIR, "embeddings.sqlite"
+)
+
+# Thumbnail names include a content hash, so browsers can cache them forever
+THUMBNAIL_SIZES = {"thumbnailUrl": 256, "thumbnailUrlLarge": 512}
+THUMBNAIL_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
 open_ai_token_cache = {}
 CACHE_KEY_TOKEN_CRED = "openai_token_cred"
 CACHE_KEY_CREATED_TIME = "created_time"
-
-
-def create_and_populate_search_index_text():
+open_ai_token_lock = threading.Lock()
+
+STAGE_TEXT = "text"
+STAGE_IMAGES = "images"
+STAGE_WIKIPEDIA = "wikipedia"
+STAGES = [STAGE_TEXT, STAGE_IMAGES, STAGE_WIKIPEDIA]
+
+
+class StageProgress:
+    def __init__(self, name: str):
+        self.name = name
+        self.total = None
+        self.completed = 0
+        self.started_time = None
+        self.status = "pending"
+        self.lock = threading.Lock()
+
+    def start(self, total: int):
+        with self.lock:
+            self.total = total
+            self.completed = 0
+            self.started_time = time.time()
+            self.status = "running"
+
+    def advance(self, count: int = 1):
+        with self.lock:
+            self.completed += count
+
+    def finish(self, status: str = "done"):
+        with self.lock:
+            self.status = status
+
+    def summary(self):
+        with self.lock:
+            if self.status != "running" or not self.total:
+                return f"{self.name}: {self.status}"
+            elapsed = max(time.time() - self.started_time, 1e-6)
+            rate = self.completed / elapsed
+            eta = f"{(self.total - self.completed) / rate:.0f}s" if rate else "?"
+            return f"{self.name}: {self.completed}/{self.total} ({rate:.1f}/s, ETA {eta})"
+
+
+def create_and_populate_search_index_text(progress: StageProgress, concurrency: int):
     created = create_search_index_text()
     if created:
-        populate_search_index_text()
+        populate_search_index_text(progress, concurrency)
+    else:
+        progress.finish("skipped")
 
 
-def create_search_index_text():
-    print(f"Ensuring search index {AZURE_SEARCH_TEXT_INDEX_NAME} exists")
+def create_search_index_text(
+    index_name: str = AZURE_SEARCH_TEXT_INDEX_NAME, dimensions: int = 1536
+):
+    print(f"Ensuring search index {index_name} exists")
     index_client = SearchIndexClient(
         endpoint=AZURE_SEARCH_SERVICE_ENDPOINT,
         credential=azure_credential,
     )
-    if AZURE_SEARCH_TEXT_INDEX_NAME not in index_client.list_index_names():
+    if index_name not in index_client.list_index_names():
         index = SearchIndex(
-            name=AZURE_SEARCH_TEXT_INDEX_NAME,
+            name=index_name,
             fields=[
                 SimpleField(
                     name="id",
@@ -86,14 +150,14 @@ def create_search_index_text():
                     name="titleVector",
                     type=SearchFieldDataType.Collection(SearchFieldDataType.Single),
                     searchable=True,
-                    vector_search_dimensions=1536,
+                    vector_search_dimensions=dimensions,
                     vector_search_configuration="my-vector-config",
                 ),
                 SearchField(
                     name="contentVector",
                     type=SearchFieldDataType.Collection(SearchFieldDataType.Single),
                     searchable=True,
-                    vector_search_dimensions=1536,
+                    vector_search_dimensions=dimensions,
                     vector_search_configuration="my-vector-config",
                 ),
             ],
@@ -125,24 +189,30 @@ def create_search_index_text():
                 ]
             ),
         )
-        print(f"Creating {AZURE_SEARCH_TEXT_INDEX_NAME} search index")
+        print(f"Creating {index_name} search index")
         index_client.create_index(index)
         return True
     else:
-        print(f"Search index {AZURE_SEARCH_TEXT_INDEX_NAME} already exists")
+        print(f"Search index {index_name} already exists")
         return False
 
 
-def populate_search_index_text():
+def populate_search_index_text(progress: StageProgress, concurrency: int):
     print(f"Populating search index {AZURE_SEARCH_TEXT_INDEX_NAME} with documents")
 
     with open("data/text-sample.json", "r", encoding="utf-8") as file:
         input_data = json.load(file)
 
     print(f"Generating Azure OpenAI embeddings...")
-    for item in input_data:
+    progress.start(len(input_data))
+
+    def embed_item(item):
         item["titleVector"] = generate_text_embeddings(item["title"])
         item["contentVector"] = generate_text_embeddings(item["content"])
+        progress.advance()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(embed_item, input_data))
 
     print(f"Uploading documents...")
     search_client = SearchClient(
@@ -151,15 +221,18 @@ def populate_search_index_text():
         index_name=AZURE_SEARCH_TEXT_INDEX_NAME,
     )
     search_client.upload_documents(input_data)
+    progress.finish()
     print(
         f"Uploaded {len(input_data)} documents to index {AZURE_SEARCH_TEXT_INDEX_NAME}"
     )
 
 
-def create_and_populate_search_index_images():
+def create_and_populate_search_index_images(progress: StageProgress, concurrency: int):
     created = create_search_index_images()
     if created:
-        populate_search_index_images()
+        populate_search_index_images(progress, concurrency)
+    else:
+        progress.finish("skipped")
 
 
 def create_search_index_images():
@@ -180,6 +253,8 @@ def create_search_index_images():
                 ),
                 SearchableField(name="title", type=SearchFieldDataType.String),
                 SimpleField(name="imageUrl", type=SearchFieldDataType.String),
+                SimpleField(name="thumbnailUrl", type=SearchFieldDataType.String),
+                SimpleField(name="thumbnailUrlLarge", type=SearchFieldDataType.String),
                 SearchField(
                     name="imageVector",
                     type=SearchFieldDataType.Collection(SearchFieldDataType.Single),
@@ -208,7 +283,7 @@ def create_search_index_images():
         return False
 
 
-def populate_search_index_images():
+def populate_search_index_images(progress: StageProgress, concurrency: int):
     search_client = SearchClient(
         endpoint=AZURE_SEARCH_SERVICE_ENDPOINT,
         credential=azure_credential,
@@ -227,36 +302,77 @@ def populate_search_index_images():
         blob_container.create_container()
 
     print(f"Uploading, embedding and indexing images...")
-    for root, dirs, files in os.walk("data/images"):
-        for file in files:
-            with open(os.path.join(root, file), "rb") as data:
-                blob_container.upload_blob(name=file, data=data, overwrite=True)
-
-            url = f"https://{AZURE_STORAGE_ACCOUNT}.blob.core.windows.net/{AZURE_STORAGE_CONTAINER}/{file}"
-            doc = {
-                "id": generate_azuresearch_id(),
-                "title": file,
-                "imageUrl": url,
-                "imageVector": generate_images_embeddings(url),
-            }
-            search_client.upload_documents(doc)
-            print(f"{file}")
-
-def create_and_populate_search_index_wikipedia():
+    image_files = [
+        (root, file) for root, dirs, files in os.walk("data/images") for file in files
+    ]
+    progress.start(len(image_files))
+
+    def index_image(root, file):
+        with open(os.path.join(root, file), "rb") as data:
+            image_bytes = data.read()
+        blob_container.upload_blob(name=file, data=image_bytes, overwrite=True)
+
+        url = f"https://{AZURE_STORAGE_ACCOUNT}.blob.core.windows.net/{AZURE_STORAGE_CONTAINER}/{file}"
+        doc = {
+            "id": generate_azuresearch_id(),
+            "title": file,
+            "imageUrl": url,
+            **upload_image_thumbnails(blob_container, file, image_bytes),
+            "imageVector": generate_images_embeddings(url),
+        }
+        search_client.upload_documents(doc)
+        progress.advance()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(lambda f: index_image(*f), image_files))
+    progress.finish()
+    print(f"Indexed {len(image_files)} images to index {AZURE_SEARCH_IMAGE_INDEX_NAME}")
+
+def upload_image_thumbnails(blob_container, file: str, image_bytes: bytes):
+    digest = hashlib.sha256(image_bytes).hexdigest()[:12]
+    name = os.path.splitext(file)[0]
+    urls = {}
+    with Image.open(BytesIO(image_bytes)) as image:
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA")
+        for field, size in THUMBNAIL_SIZES.items():
+            thumbnail = image.copy()
+            thumbnail.thumbnail((size, size))
+            buffer = BytesIO()
+            thumbnail.save(buffer, format="WEBP", quality=80)
+
+            blob_name = f"thumbnails/{size}/{name}-{digest}.webp"
+            blob_container.upload_blob(
+                name=blob_name,
+                data=buffer.getvalue(),
+                overwrite=True,
+                content_settings=ContentSettings(
+                    content_type="image/webp", cache_control=THUMBNAIL_CACHE_CONTROL
+                ),
+            )
+            urls[field] = f"https://{AZURE_STORAGE_ACCOUNT}.blob.core.windows.net/{AZURE_STORAGE_CONTAINER}/{blob_name}"
+    return urls
+
+
+def create_and_populate_search_index_wikipedia(progress: StageProgress, concurrency: int):
     created = create_search_index_wikipedia()
     if created:
-        populate_search_index_wikipedia()
+        populate_search_index_wikipedia(progress, concurrency)
+    else:
+        progress.finish("skipped")
 
 
-def create_search_index_wikipedia():
-    print(f"Ensuring search index {AZURE_SEARCH_WIKIPEDIA_INDEX_NAME} exists")
+def create_search_index_wikipedia(
+    index_name: str = AZURE_SEARCH_WIKIPEDIA_INDEX_NAME, dimensions: int = 1536
+):
+    print(f"Ensuring search index {index_name} exists")
     index_client = SearchIndexClient(
         endpoint=AZURE_SEARCH_SERVICE_ENDPOINT,
         credential=azure_credential,
     )
-    if AZURE_SEARCH_WIKIPEDIA_INDEX_NAME not in index_client.list_index_names():
+    if index_name not in index_client.list_index_names():
         index = SearchIndex(
-            name=AZURE_SEARCH_WIKIPEDIA_INDEX_NAME,
+            name=index_name,
             fields=[
                 SimpleField(
                     name="vector_id",
@@ -274,14 +390,14 @@ def create_search_index_wikipedia():
                     name="titleVector",
                     type=SearchFieldDataType.Collection(SearchFieldDataType.Single),
                     searchable=True,
-                    vector_search_dimensions=1536,
+                    vector_search_dimensions=dimensions,
                     vector_search_configuration="my-vector-config",
                 ),
                 SearchField(
                     name="contentVector",
                     type=SearchFieldDataType.Collection(SearchFieldDataType.Single),
                     searchable=True,
-                    vector_search_dimensions=1536,
+                    vector_search_dimensions=dimensions,
                     vector_search_configuration="my-vector-config",
                 ),
             ],
@@ -313,58 +429,385 @@ def create_search_index_wikipedia():
                 ]
             ),
         )
-        print(f"Creating {AZURE_SEARCH_WIKIPEDIA_INDEX_NAME} search index")
+        print(f"Creating {index_name} search index")
         index_client.create_index(index)
         return True
     else:
-        print(f"Search index {AZURE_SEARCH_WIKIPEDIA_INDEX_NAME} already exists")
+        print(f"Search index {index_name} already exists")
         return False
 
 
-def populate_search_index_wikipedia():
+def populate_search_index_wikipedia(progress: StageProgress, concurrency: int):
     print(f"Populating search index {AZURE_SEARCH_WIKIPEDIA_INDEX_NAME} with documents")
 
+    article_df, title_vectors, content_vectors = load_wikipedia_articles(
+        download_wikipedia_articles()
+    )
+    # Written here so the articles are not loaded a second time for typeahead
+    save_title_suggestions("wikipedia", article_df["title"].unique().tolist())
+
+    print(f"Uploading documents...")
+    search_client = SearchClient(
+        endpoint=AZURE_SEARCH_SERVICE_ENDPOINT,
+        credential=azure_credential,
+        index_name=AZURE_SEARCH_WIKIPEDIA_INDEX_NAME,
+    )
+
+    batch_size = 250  
+    progress.start(len(article_df))
+
+    def upload_batch(start):
+        end = start + batch_size
+        batch = article_df.iloc[start:end].to_dict(orient="records")
+        for document, title_vector, content_vector in zip(
+            batch, title_vectors[start:end], content_vectors[start:end]
+        ):
+            document["titleVector"] = title_vector.tolist()
+            document["contentVector"] = content_vector.tolist()
+        search_client.upload_documents(batch)
+        progress.advance(len(batch))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(upload_batch, range(0, len(article_df), batch_size)))
+    progress.finish()
+    print(
+        f"Uploaded {len(article_df)} documents to index {AZURE_SEARCH_WIKIPEDIA_INDEX_NAME}"
+    )
+
+
+def download_wikipedia_articles():
     embeddings_url = "https://cdn.openai.com/API/examples/data/vector_database_wikipedia_articles_embedded.zip"
     zipFilename = "vector_database_wikipedia_articles_embedded.zip"
-    csvFilename = "vector_database_wikipedia_articles_embedded.csv"
     folderPath = "data/wikipedia"
     zipFilePath = os.path.join(folderPath,zipFilename)
-    cvsFilePath = os.path.join(folderPath,csvFilename)
     if not os.path.exists(folderPath):
         os.makedirs(folderPath)
 
     if not os.path.exists(zipFilePath):
         wget.download(embeddings_url, out=folderPath)
-    
+    return zipFilePath
+
+
+# Parsing the embedded CSV is slow, so the first run caches the articles as
+# Parquet metadata plus float32 .npy vector matrices, keyed by the zip checksum
+def load_wikipedia_articles(zipFilePath: str):
+    folderPath = os.path.dirname(zipFilePath)
+    csvFilename = "vector_database_wikipedia_articles_embedded.csv"
+    cachePath = os.path.join(folderPath, "cache")
+    manifestPath = os.path.join(cachePath, "manifest.json")
+    metadataPath = os.path.join(cachePath, "articles.parquet")
+    titleVectorsPath = os.path.join(cachePath, "titleVector.npy")
+    contentVectorsPath = os.path.join(cachePath, "contentVector.npy")
+
+    checksum = file_sha256(zipFilePath)
+    if os.path.exists(manifestPath):
+        with open(manifestPath, "r", encoding="utf-8") as file:
+            manifest = json.load(file)
+        if manifest.get("checksum") == checksum:
+            print(f"Loading Wikipedia articles from cache {cachePath}")
+            return (
+                pd.read_parquet(metadataPath),
+                np.load(titleVectorsPath, mmap_mode="r"),
+                np.load(contentVectorsPath, mmap_mode="r"),
+            )
+        print(f"Wikipedia cache {cachePath} is stale, rebuilding")
+
     with zipfile.ZipFile(zipFilePath,"r") as zip_ref:
         zip_ref.extract(csvFilename, folderPath)
 
-    article_df = pd.read_csv(cvsFilePath)
-    article_df.rename(columns = {'title_vector':'titleVector', 'content_vector': 'contentVector'}, inplace=True)
-  
-    # Read vectors from strings back into a list using json.loads  
-    article_df["titleVector"] = article_df.titleVector.apply(json.loads)  
-    article_df["contentVector"] = article_df.contentVector.apply(json.loads)  
+    article_df = pd.read_csv(os.path.join(folderPath, csvFilename))
+
+    # Read vectors from strings into float32 matrices using json.loads
+    title_vectors = np.array(
+        [json.loads(v) for v in article_df.pop("title_vector")], dtype=np.float32
+    )
+    content_vectors = np.array(
+        [json.loads(v) for v in article_df.pop("content_vector")], dtype=np.float32
+    )
     article_df['id'] = article_df['id'].astype(str)  
     article_df['vector_id'] = article_df['vector_id'].astype(str)
-    documents = article_df.to_dict(orient='records')
 
-    print(f"Uploading documents...")
+    if not os.path.exists(cachePath):
+        os.makedirs(cachePath)
+    article_df.to_parquet(metadataPath, index=False)
+    np.save(titleVectorsPath, title_vectors)
+    np.save(contentVectorsPath, content_vectors)
+    # Written last so an interrupted run never leaves a cache that looks valid
+    with open(manifestPath, "w", encoding="utf-8") as file:
+        json.dump({"checksum": checksum, "rows": len(article_df)}, file)
+
+    return article_df, title_vectors, content_vectors
+
+
+def file_sha256(path: str):
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def create_title_suggestions(stages: list[str]):
+    if STAGE_TEXT in stages:
+        with open("data/text-sample.json", "r", encoding="utf-8") as file:
+            save_title_suggestions("sample", [item["title"] for item in json.load(file)])
+
+    # The wikipedia stage writes its titles while populating the index, so the
+    # articles are only loaded here when the index already existed
+    wikipedia_titles_path = os.path.join(EMBEDDING_BUNDLE_DIR, "titles-wikipedia.json")
+    if STAGE_WIKIPEDIA in stages and not os.path.exists(wikipedia_titles_path):
+        article_df, _, _ = load_wikipedia_articles(download_wikipedia_articles())
+        save_title_suggestions("wikipedia", article_df["title"].unique().tolist())
+
+
+# The backend builds its /suggest index from these title lists
+def save_title_suggestions(data_set: str, titles: list[str]):
+    if not os.path.exists(EMBEDDING_BUNDLE_DIR):
+        os.makedirs(EMBEDDING_BUNDLE_DIR)
+    titles_path = os.path.join(EMBEDDING_BUNDLE_DIR, f"titles-{data_set}.json")
+    with open(titles_path, "w", encoding="utf-8") as file:
+        json.dump(titles, file, ensure_ascii=False)
+    print(f"Wrote {len(titles)} {data_set} titles to {titles_path}")
+
+
+def create_query_embedding_bundle():
+    print(f"Embedding sample queries for deployment {AZURE_OPENAI_DEPLOYMENT_NAME}")
+
+    with open("app/backend/sample-queries.json", "r", encoding="utf-8") as file:
+        sample_queries = json.load(file)
+    queries = list(
+        dict.fromkeys(query for values in sample_queries.values() for query in values)
+    )
+
+    index_path = os.path.join(EMBEDDING_BUNDLE_DIR, f"{AZURE_OPENAI_DEPLOYMENT_NAME}.json")
+    vectors_path = os.path.join(EMBEDDING_BUNDLE_DIR, f"{AZURE_OPENAI_DEPLOYMENT_NAME}.npy")
+    if not os.path.exists(EMBEDDING_BUNDLE_DIR):
+        os.makedirs(EMBEDDING_BUNDLE_DIR)
+
+    # Reuse embeddings from a previous bundle so only new queries are embedded
+    existing = {}
+    if os.path.exists(index_path) and os.path.exists(vectors_path):
+        with open(index_path, "r", encoding="utf-8") as file:
+            existing_queries = json.load(file)["queries"]
+        existing = dict(zip(existing_queries, np.load(vectors_path)))
+
+    vectors = np.empty((len(queries), 1536), dtype=np.float32)
+    for row, query in enumerate(queries):
+        vector = existing.get(query)
+        vectors[row] = vector if vector is not None else generate_text_embeddings(query)
+
+    np.save(vectors_path, vectors)
+    with open(index_path, "w", encoding="utf-8") as file:
+        json.dump(
+            {"deployment": AZURE_OPENAI_DEPLOYMENT_NAME, "queries": queries}, file
+        )
+    print(f"Wrote {len(queries)} query embeddings to {vectors_path}")
+
+
+# Reduced-dimension variants of the text indexes, used to compare vector size,
+# index build time and query latency against recall. Specs look like
+# "wikipedia:truncate-256" (keep the leading dimensions, Matryoshka-style) or
+# "sample:pca-128" (project onto the top principal components of the dataset).
+def create_and_populate_search_index_variant(
+    variant_spec: str, recreate: bool, concurrency: int
+):
+    data_set, variant = variant_spec.split(":")
+    kind, dimensions = variant.split("-")
+    dimensions = int(dimensions)
+    if kind not in ["truncate", "pca"] or not 0 < dimensions < 1536:
+        raise Exception(f"Unsupported index variant {variant_spec}")
+
+    name = f"{data_set}-{variant}"
+    if data_set == "sample":
+        index_name = f"{AZURE_SEARCH_TEXT_INDEX_NAME}-{variant}"
+        create_index = create_search_index_text
+    elif data_set == "wikipedia":
+        index_name = f"{AZURE_SEARCH_WIKIPEDIA_INDEX_NAME}-{variant}"
+        create_index = create_search_index_wikipedia
+    else:
+        raise Exception(f"Unsupported index variant {variant_spec}")
+
+    projection_file = f"{name}.npz" if kind == "pca" else None
+    if recreate:
+        delete_search_index(index_name)
+    if not create_index(index_name, dimensions):
+        record_existing_search_index_variant(
+            name, data_set, index_name, kind, dimensions, projection_file
+        )
+        return
+
+    if data_set == "sample":
+        documents, title_vectors, content_vectors = load_search_index_text_documents()
+    else:
+        article_df, title_vectors, content_vectors = load_wikipedia_articles(
+            download_wikipedia_articles()
+        )
+        documents = article_df.to_dict(orient="records")
+
+    print(f"Populating search index {index_name} with {kind} {dimensions}-dim vectors")
+    started_time = time.time()
+    if kind == "truncate":
+        title_vectors = title_vectors[:, :dimensions]
+        content_vectors = content_vectors[:, :dimensions]
+    else:
+        count = len(title_vectors) + len(content_vectors)
+        if dimensions >= count:
+            raise Exception(
+                f"{data_set} has {count} vectors, too few for {dimensions} components"
+            )
+        mean, components = principal_components(
+            [title_vectors, content_vectors], dimensions
+        )
+        title_vectors = project_vectors(title_vectors, mean, components)
+        content_vectors = project_vectors(content_vectors, mean, components)
+
+        # The backend projects query vectors with the same mean and components
+        if not os.path.exists(EMBEDDING_BUNDLE_DIR):
+            os.makedirs(EMBEDDING_BUNDLE_DIR)
+        np.savez(
+            os.path.join(EMBEDDING_BUNDLE_DIR, projection_file),
+            mean=mean,
+            components=components,
+        )
+
     search_client = SearchClient(
         endpoint=AZURE_SEARCH_SERVICE_ENDPOINT,
         credential=azure_credential,
-        index_name=AZURE_SEARCH_WIKIPEDIA_INDEX_NAME,
+        index_name=index_name,
+    )
+    batch_size = 250
+
+    def upload_batch(start):
+        end = start + batch_size
+        batch = [dict(document) for document in documents[start:end]]
+        for document, title_vector, content_vector in zip(
+            batch, title_vectors[start:end], content_vectors[start:end]
+        ):
+            document["titleVector"] = title_vector.tolist()
+            document["contentVector"] = content_vector.tolist()
+        search_client.upload_documents(batch)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(upload_batch, range(0, len(documents), batch_size)))
+    build_seconds = time.time() - started_time
+    print(f"Uploaded {len(documents)} documents to index {index_name} in {build_seconds:.0f}s")
+
+    save_search_index_variant(
+        {
+            "name": name,
+            "dataSet": data_set,
+            "indexName": index_name,
+            "kind": kind,
+            "dimensions": dimensions,
+            "projection": projection_file,
+            "vectorBytes": dimensions * 4,
+            "documents": len(documents),
+            "buildSeconds": round(build_seconds, 1),
+        }
     )
 
-    batch_size = 250  
-    batches = [documents[i:i + batch_size] for i in range(0, len(documents), batch_size)]  
-  
-    for batch in batches:  
-        search_client.upload_documents(batch) 
-    print(
-        f"Uploaded {len(documents)} documents to index {AZURE_SEARCH_WIKIPEDIA_INDEX_NAME}"
+
+# The Wikipedia vectors are memory-mapped and too large to copy, so the mean and
+# covariance are accumulated a block of rows at a time in float32
+def principal_components(matrices: list[np.ndarray], dimensions: int, block_size: int = 8192):
+    count = sum(len(vectors) for vectors in matrices)
+    total = np.zeros(matrices[0].shape[1], dtype=np.float64)
+    for vectors in matrices:
+        for start in range(0, len(vectors), block_size):
+            total += np.asarray(vectors[start : start + block_size], dtype=np.float32).sum(axis=0, dtype=np.float64)
+    mean = (total / count).astype(np.float32)
+
+    covariance = np.zeros((len(mean), len(mean)), dtype=np.float64)
+    for vectors in matrices:
+        for start in range(0, len(vectors), block_size):
+            block = np.asarray(vectors[start : start + block_size], dtype=np.float32) - mean
+            covariance += block.T @ block
+    covariance /= count - 1
+
+    # Eigenvectors of the covariance matrix, largest eigenvalues first
+    _, eigenvectors = np.linalg.eigh(covariance)
+    components = np.ascontiguousarray(
+        eigenvectors[:, ::-1][:, :dimensions].T, dtype=np.float32
     )
+    return mean, components
+
+
+def project_vectors(vectors: np.ndarray, mean: np.ndarray, components: np.ndarray, block_size: int = 8192):
+    projected = np.empty((len(vectors), len(components)), dtype=np.float32)
+    for start in range(0, len(vectors), block_size):
+        block = np.asarray(vectors[start : start + block_size], dtype=np.float32)
+        projected[start : start + block_size] = (block - mean) @ components.T
+    return projected
+
+
+# variants.json and the PCA projections are not committed, so an index built on
+# another machine may exist without them. A missing entry is recorded again from
+# the index, but a missing projection can only be rebuilt with the index.
+def record_existing_search_index_variant(
+    name: str, data_set: str, index_name: str, kind: str, dimensions: int, projection_file: str | None
+):
+    if projection_file and not os.path.exists(
+        os.path.join(EMBEDDING_BUNDLE_DIR, projection_file)
+    ):
+        raise Exception(
+            f"Search index {index_name} exists but its PCA projection {projection_file} is missing, pass --recreate to rebuild it"
+        )
+    if any(v["name"] == name for v in load_search_index_variants()):
+        return
 
+    search_client = SearchClient(
+        endpoint=AZURE_SEARCH_SERVICE_ENDPOINT,
+        credential=azure_credential,
+        index_name=index_name,
+    )
+    print(f"Recording existing search index {index_name} as variant {name}")
+    save_search_index_variant(
+        {
+            "name": name,
+            "dataSet": data_set,
+            "indexName": index_name,
+            "kind": kind,
+            "dimensions": dimensions,
+            "projection": projection_file,
+            "vectorBytes": dimensions * 4,
+            "documents": search_client.get_document_count(),
+            "buildSeconds": None,
+        }
+    )
+
+
+# Reads the sample documents and their full vectors back from the text index
+def load_search_index_text_documents():
+    search_client = SearchClient(
+        endpoint=AZURE_SEARCH_SERVICE_ENDPOINT,
+        credential=azure_credential,
+        index_name=AZURE_SEARCH_TEXT_INDEX_NAME,
+    )
+    documents = [
+        {key: value for key, value in r.items() if not key.startswith("@")}
+        for r in search_client.search("*", top=1000)
+    ]
+    title_vectors = np.array([d.pop("titleVector") for d in documents], dtype=np.float32)
+    content_vectors = np.array([d.pop("contentVector") for d in documents], dtype=np.float32)
+    return documents, title_vectors, content_vectors
+
+
+# The backend registers every variant listed here as an extra dataset
+def load_search_index_variants():
+    variants_path = os.path.join(EMBEDDING_BUNDLE_DIR, "variants.json")
+    if not os.path.exists(variants_path):
+        return []
+    with open(variants_path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def save_search_index_variant(variant: dict):
+    variants_path = os.path.join(EMBEDDING_BUNDLE_DIR, "variants.json")
+    variants = [v for v in load_search_index_variants() if v["name"] != variant["name"]] + [variant]
+    if not os.path.exists(EMBEDDING_BUNDLE_DIR):
+        os.makedirs(EMBEDDING_BUNDLE_DIR)
+    with open(variants_path, "w", encoding="utf-8") as file:
+        json.dump(variants, file, indent=4)
 
 
 def delete_search_index(name: str):
@@ -396,12 +839,24 @@ def generate_images_embeddings(image_url):
     return response.json()["vector"]
 
 
+# Embeddings are persisted in the store shared with the backend, so a text is
+# only ever embedded once per deployment
+def generate_text_embeddings(text):
+    embedding = embedding_store.get(AZURE_OPENAI_DEPLOYMENT_NAME, text)
+    if embedding is not None:
+        return embedding.tolist()
+
+    embedding = request_text_embeddings(text)
+    embedding_store.put(AZURE_OPENAI_DEPLOYMENT_NAME, text, embedding)
+    return embedding
+
+
 @retry(
     wait=wait_random_exponential(min=1, max=60),
     stop=stop_after_attempt(15),
     before_sleep=before_retry_sleep,
 )
-def generate_text_embeddings(text):
+def request_text_embeddings(text):
     refresh_openai_token()
     response = openai.Embedding.create(input=text, engine=AZURE_OPENAI_DEPLOYMENT_NAME)
     return response["data"][0]["embedding"]
@@ -409,12 +864,13 @@ def generate_text_embeddings(text):
 
 # refresh open ai token every 5 minutes
 def refresh_openai_token():
-    if open_ai_token_cache[CACHE_KEY_CREATED_TIME] + 300 < time.time():
-        token_cred = open_ai_token_cache[CACHE_KEY_TOKEN_CRED]
-        openai.api_key = token_cred.get_token(
-            "https://cognitiveservices.azure.com/.default"
-        ).token
-        open_ai_token_cache[CACHE_KEY_CREATED_TIME] = time.time()
+    with open_ai_token_lock:
+        if open_ai_token_cache[CACHE_KEY_CREATED_TIME] + 300 < time.time():
+            token_cred = open_ai_token_cache[CACHE_KEY_TOKEN_CRED]
+            openai.api_key = token_cred.get_token(
+                "https://cognitiveservices.azure.com/.default"
+            ).token
+            open_ai_token_cache[CACHE_KEY_CREATED_TIME] = time.time()
 
 
 def generate_azuresearch_id():
@@ -425,6 +881,49 @@ def generate_azuresearch_id():
     return id
 
 
+def run_stages(stages: list[str], recreate: bool, concurrency: dict[str, int]):
+    stage_functions = {
+        STAGE_TEXT: (create_and_populate_search_index_text, AZURE_SEARCH_TEXT_INDEX_NAME),
+        STAGE_IMAGES: (create_and_populate_search_index_images, AZURE_SEARCH_IMAGE_INDEX_NAME),
+        STAGE_WIKIPEDIA: (create_and_populate_search_index_wikipedia, AZURE_SEARCH_WIKIPEDIA_INDEX_NAME),
+    }
+    progresses = {stage: StageProgress(stage) for stage in stages}
+
+    def run_stage(stage):
+        create_and_populate, index_name = stage_functions[stage]
+        if recreate:
+            delete_search_index(index_name)
+        create_and_populate(progresses[stage], concurrency[stage])
+
+    # The stages use independent upstream quotas, so they run side by side
+    stop_reporting = threading.Event()
+
+    def report_progress():
+        while not stop_reporting.wait(10):
+            print(" | ".join(p.summary() for p in progresses.values()))
+
+    reporter = threading.Thread(target=report_progress, daemon=True)
+    reporter.start()
+
+    failed = []
+    with ThreadPoolExecutor(max_workers=len(stages)) as executor:
+        futures = {executor.submit(run_stage, stage): stage for stage in stages}
+        for future in as_completed(futures):
+            stage = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                progresses[stage].finish("failed")
+                print(f"Stage {stage} failed: {e}")
+                failed.append(stage)
+
+    stop_reporting.set()
+    reporter.join()
+    print(" | ".join(p.summary() for p in progresses.values()))
+    if failed:
+        raise Exception(f"Failed stages: {', '.join(failed)}")
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description="Prepares the required Azure Cognitive Search indexes for the app",
@@ -435,6 +934,29 @@ if __name__ == "__main__":
         action="store_true",
         help="Optional. Recreate all the ACS indexes",
     )
+    parser.add_argument(
+        "--only",
+        required=False,
+        nargs="+",
+        choices=STAGES,
+        default=STAGES,
+        help="Optional. Only prepare the given indexes",
+    )
+    for stage in STAGES:
+        parser.add_argument(
+            f"--{stage}-concurrency",
+            required=False,
+            type=int,
+            default=4,
+            help=f"Optional. Number of parallel requests for the {stage} index",
+        )
+    parser.add_argument(
+        "--variants",
+        required=False,
+        nargs="+",
+        default=[],
+        help="Optional. Reduced-dimension index variants to build, e.g. wikipedia:truncate-256 sample:pca-128. Sample variants use --text-concurrency and wikipedia variants --wikipedia-concurrency",
+    )
     args = parser.parse_args()
 
     # Use the current user identity to connect to Azure services
@@ -454,19 +976,32 @@ if __name__ == "__main__":
     open_ai_token_cache[CACHE_KEY_CREATED_TIME] = time.time()
     open_ai_token_cache[CACHE_KEY_TOKEN_CRED] = azure_credential
 
-    # Create text index
-    if args.recreate:
-        delete_search_index(AZURE_SEARCH_TEXT_INDEX_NAME)
-    create_and_populate_search_index_text()
+    embedding_store = EmbeddingStore(EMBEDDING_STORE_PATH)
 
-    # Create image index
-    if args.recreate:
-        delete_search_index(AZURE_SEARCH_IMAGE_INDEX_NAME)
-    create_and_populate_search_index_images()
+    # Create text, image and wikipedia indexes
+    run_stages(
+        args.only,
+        args.recreate,
+        {stage: getattr(args, f"{stage}_concurrency") for stage in STAGES},
+    )
 
-    # Create wikipedia index
-    if args.recreate:
-        delete_search_index(AZURE_SEARCH_WIKIPEDIA_INDEX_NAME)
-    create_and_populate_search_index_wikipedia()
+    # Pre-embed sample queries and list titles for typeahead in the backend.
+    # Both only serve the text datasets, so an images-only run skips them.
+    if STAGE_TEXT in args.only or STAGE_WIKIPEDIA in args.only:
+        create_query_embedding_bundle()
+    create_title_suggestions(args.only)
+
+    # Build reduced-dimension variants from the full indexes, each with the
+    # concurrency of the index it copies
+    variant_concurrency = {
+        "sample": args.text_concurrency,
+        "wikipedia": args.wikipedia_concurrency,
+    }
+    for variant_spec in args.variants:
+        create_and_populate_search_index_variant(
+            variant_spec,
+            args.recreate,
+            variant_concurrency.get(variant_spec.split(":")[0], 4),
+        )
  
     print("Completed successfully")